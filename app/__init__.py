@@ -1,20 +1,18 @@
 from flask import Flask, render_template, redirect, request, session
 import os
 
-# Slugs válidos (ajusta si cambian)
-SLUGS_VALIDOS = {
-    "clinic_prime": "Clinic Prime",
-    "dra_pia": "Dra Pia",
-    "harmony": "Harmony",
-    "mc_dent": "Mc Dent",
-    "amaru": "Amaru",
-    "dra_claudia": "Dra Claudia",
-}
+# Slugs válidos: salen de clients.json (se recarga solo si cambia)
+from app.registry import registry
 
 def create_app():
     app = Flask(__name__)  # usa /app/templates y /app/static
     app.secret_key = os.environ.get("SECRET_KEY", "dev-secret")
 
+    # JSON rápido (orjson si está) y gzip/brotli para respuestas grandes
+    from . import compression, json_provider
+    json_provider.init_app(app)
+    compression.init_app(app)
+
     # Claves opcionales
     # Si MAGIC_KEY/ADMIN_KEY NO están definidas en el entorno,
     # NO se exigirá el parámetro ?k=...
@@ -29,7 +27,7 @@ def create_app():
         session.pop("client_slug", None)
 
     def slug_valido(slug: str) -> bool:
-        return slug in SLUGS_VALIDOS
+        return slug in registry
 
     # ---- Magic link por clienta ----
     @app.route("/s/<slug>")
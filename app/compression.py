@@ -0,0 +1,67 @@
+# app/compression.py
+"""
+Compresión gzip/brotli de respuestas dinámicas grandes (JSON, HTML).
+
+- brotli si está instalado y el navegador manda 'br'; si no, gzip.
+- No toca streams (SSE de /api/overview/stream), archivos servidos con
+  send_file (estáticos y miniaturas) ni respuestas ya codificadas.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024") or 1024)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # buen punto medio entre CPU y tamaño para respuestas dinámicas
+
+COMPRESSIBLE = {
+    "application/json",
+    "text/html",
+    "text/plain",
+}
+
+
+def _accepts(encoding: str) -> bool:
+    return request.accept_encodings[encoding] > 0
+
+
+def compress_response(response):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    if brotli is not None and _accepts("br"):
+        body, encoding = brotli.compress(data, quality=BROTLI_QUALITY), "br"
+    elif _accepts("gzip"):
+        body, encoding = gzip.compress(data, GZIP_LEVEL), "gzip"
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app) -> None:
+    if os.getenv("DISABLE_COMPRESSION"):
+        return
+    app.after_request(compress_response)
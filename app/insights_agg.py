@@ -0,0 +1,246 @@
+# app/insights_agg.py
+"""
+Agregación de filas de /insights en columnas NumPy.
+
+Todas las rutas que suman gasto y "mensajes iniciados" pasan por aquí:
+  - parse_rows(): filas Graph -> InsightsFrame (spend, results, entity; date
+    se arma solo si alguien la lee)
+  - totals() / group_by_entity() / per_row(): sumas, group-by y CPR
+  - metrics(): redondeo y CPR con round() de Python, igual que el f2() anterior
+
+Las filas llegan como dicts anidados: recorrerlas en Python es inevitable,
+así que se hace UNA sola pasada que llena las columnas; las sumas, el
+group-by y el orden van en NumPy (bincount/argsort).
+
+Los action_type que cuentan como resultado se configuran con
+FB_MESSAGE_ACTION_TYPES (lista separada por comas).
+
+Micro-benchmark contra los bucles por fila: python -m app.insights_agg
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_MESSAGE_ACTION_TYPES = (
+    "onsite_conversion.messaging_conversation_started_7d",
+    "onsite_conversion.messaging_conversation_started",
+)
+MESSAGE_ACTION_TYPES = frozenset(
+    t.strip()
+    for t in (os.getenv("FB_MESSAGE_ACTION_TYPES") or ",".join(DEFAULT_MESSAGE_ACTION_TYPES)).split(",")
+    if t.strip()
+)
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v or 0)
+    except Exception:
+        return 0.0
+
+
+class InsightsFrame:
+    """Columnas paralelas de un lote de filas de insights."""
+
+    __slots__ = ("spend", "results", "entity", "ids", "_rows", "_date")
+
+    def __init__(
+        self,
+        spend: np.ndarray,
+        results: np.ndarray,
+        entity: np.ndarray,
+        ids: np.ndarray,
+        rows: Sequence[Dict[str, Any]] = (),
+    ) -> None:
+        self.spend = spend      # float64, ya redondeado a 2 decimales por fila
+        self.results = results  # float64, mensajes iniciados
+        self.entity = entity    # int64, índice en ids (-1 si la fila no tiene id)
+        self.ids = ids          # ids únicos (str), en orden de aparición
+        self._rows = rows
+        self._date: Optional[np.ndarray] = None
+
+    @property
+    def date(self) -> np.ndarray:
+        """datetime64[D] (date_start), NaT si falta. Se calcula al primer uso."""
+        if self._date is None:
+            self._date = _dates(self._rows)
+        return self._date
+
+    def __len__(self) -> int:
+        return int(self.spend.shape[0])
+
+
+def _dates(rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+    raw = [r.get("date_start") or "NaT" for r in rows]
+    try:
+        return np.array(raw, dtype="datetime64[D]")
+    except ValueError:
+        return np.full(len(raw), np.datetime64("NaT"), dtype="datetime64[D]")
+
+
+def _round2(col: np.ndarray) -> np.ndarray:
+    # np.round (escala + rint) no siempre coincide con round() de Python
+    # (495.185 -> 495.18 vs 495.19). Graph manda el gasto con 2 decimales,
+    # así que casi siempre ya está redondeado; si no, se usa round().
+    if np.array_equal(np.round(col, 2), col):
+        return col
+    return np.array([round(v, 2) for v in col.tolist()], dtype=np.float64)
+
+
+def _floats(raw: List[Any]) -> np.ndarray:
+    try:
+        # Graph manda strings ("12.34"): NumPy los convierte en bloque
+        return np.array(raw, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.fromiter((_num(v) for v in raw), dtype=np.float64, count=len(raw))
+
+
+def parse_rows(
+    rows: Optional[Sequence[Dict[str, Any]]],
+    id_field: Optional[str] = None,
+    action_types: Optional[Iterable[str]] = None,
+) -> InsightsFrame:
+    """Convierte filas de Graph en un InsightsFrame (una sola pasada)."""
+    rows = rows or []
+    types = frozenset(action_types) if action_types is not None else MESSAGE_ACTION_TYPES
+
+    spend: List[Any] = []
+    results: List[float] = []
+    entity: List[int] = []
+    codes: Dict[str, int] = {}
+    add_spend, add_result, add_entity = spend.append, results.append, entity.append
+    for r in rows:
+        add_spend(r.get("spend") or 0)
+        msgs = 0.0
+        for a in r.get("actions") or ():
+            if a.get("action_type") in types:
+                msgs += _num(a.get("value"))
+        add_result(msgs)
+        if id_field:
+            v = r.get(id_field)
+            add_entity(codes.setdefault(v, len(codes)) if v else -1)
+
+    n = len(rows)
+    return InsightsFrame(
+        _round2(_floats(spend)),
+        np.array(results, dtype=np.float64),
+        np.array(entity, dtype=np.int64) if id_field else np.full(n, -1, dtype=np.int64),
+        np.array(list(codes), dtype=str),
+        rows,
+    )
+
+
+def metrics(spend: float, results: float) -> Dict[str, float]:
+    spend = round(float(spend), 2)
+    results = float(results)
+    return {
+        "spend": spend,
+        "results": results,
+        "cpr": round(spend / results, 2) if results > 0 else 0.0,
+    }
+
+
+def totals(frame: InsightsFrame) -> Tuple[float, float]:
+    """(gasto, mensajes) sumados de todo el frame."""
+    return float(frame.spend.sum()), float(frame.results.sum())
+
+
+def group_by_entity(frame: InsightsFrame) -> List[Dict[str, Any]]:
+    """Suma por id (campaña/anuncio) y calcula CPR. Orden: gasto desc."""
+    mask = frame.entity >= 0
+    k = int(frame.ids.size)
+    if not k:
+        return []
+    spend = np.bincount(frame.entity[mask], weights=frame.spend[mask], minlength=k)
+    results = np.bincount(frame.entity[mask], weights=frame.results[mask], minlength=k)
+    order = np.argsort(-spend, kind="stable")
+    return [{"id": str(frame.ids[i]), **metrics(spend[i], results[i])} for i in order]
+
+
+def per_row(frame: InsightsFrame) -> Dict[str, np.ndarray]:
+    """spend/results/cpr por fila (p. ej. series diarias)."""
+    cpr = [
+        round(s / m, 2) if m > 0 else 0.0
+        for s, m in zip(frame.spend.tolist(), frame.results.tolist())
+    ]
+    return {"spend": frame.spend, "results": frame.results, "cpr": np.array(cpr, dtype=np.float64)}
+
+
+# -----------------------------------------------------------------------------
+# Micro-benchmark: python -m app.insights_agg [filas] [entidades]
+# -----------------------------------------------------------------------------
+def _legacy_group(rows: Sequence[Dict[str, Any]], id_field: str) -> List[Dict[str, Any]]:
+    """Bucle por fila equivalente al que tenían las rutas."""
+    acc: Dict[str, List[float]] = {}
+    for row in rows:
+        cid = row.get(id_field)
+        if not cid:
+            continue
+        try:
+            spend = round(float(row.get("spend") or 0), 2)
+        except Exception:
+            spend = 0.0
+        msgs = 0.0
+        for a in row.get("actions") or []:
+            if a.get("action_type") in DEFAULT_MESSAGE_ACTION_TYPES:
+                try:
+                    msgs += float(a.get("value", 0) or 0)
+                except Exception:
+                    pass
+        slot = acc.setdefault(cid, [0.0, 0.0])
+        slot[0] += spend
+        slot[1] += msgs
+    out = [
+        {"id": k, "spend": round(s, 2), "results": m, "cpr": round(s / m, 2) if m > 0 else 0.0}
+        for k, (s, m) in acc.items()
+    ]
+    out.sort(key=lambda x: x["spend"], reverse=True)
+    return out
+
+
+def _bench(n_rows: int = 50_000, n_entities: int = 400, repeat: int = 5) -> None:
+    import random
+    import timeit
+
+    rnd = random.Random(7)
+    base = np.datetime64("2025-01-01")
+    rows = [
+        {
+            "ad_id": str(1_000 + rnd.randrange(n_entities)),
+            "date_start": str(base + np.timedelta64(i % 180, "D")),
+            "spend": f"{rnd.uniform(0, 80):.2f}",
+            "actions": [
+                {"action_type": "link_click", "value": str(rnd.randrange(50))},
+                {"action_type": DEFAULT_MESSAGE_ACTION_TYPES[0], "value": str(rnd.randrange(8))},
+                {"action_type": "post_engagement", "value": str(rnd.randrange(90))},
+            ],
+        }
+        for i in range(n_rows)
+    ]
+
+    legacy = _legacy_group(rows, "ad_id")
+    fast = group_by_entity(parse_rows(rows, id_field="ad_id"))
+    assert {r["id"]: (r["spend"], r["results"]) for r in legacy} == {
+        r["id"]: (r["spend"], r["results"]) for r in fast
+    }, "resultados distintos"
+
+    frame = parse_rows(rows, id_field="ad_id")
+    t_legacy = min(timeit.repeat(lambda: _legacy_group(rows, "ad_id"), number=1, repeat=repeat))
+    t_parse = min(timeit.repeat(lambda: parse_rows(rows, id_field="ad_id"), number=1, repeat=repeat))
+    t_group = min(timeit.repeat(lambda: group_by_entity(frame), number=1, repeat=repeat))
+
+    print(f"{n_rows} filas, {n_entities} entidades (mejor de {repeat})")
+    print(f"  bucle por fila        : {t_legacy * 1000:8.2f} ms")
+    print(f"  parse_rows (columnas) : {t_parse * 1000:8.2f} ms")
+    print(f"  group_by_entity       : {t_group * 1000:8.2f} ms")
+    print(f"  parse + group         : {(t_parse + t_group) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = [int(a) for a in sys.argv[1:3]]
+    _bench(*args)
@@ -0,0 +1,133 @@
+# app/json_provider.py
+"""
+Proveedor JSON rápido para jsonify().
+
+Usa orjson si está instalado (serializa a bytes, entiende numpy y datetime);
+si no, o con JSON_PROVIDER=stdlib, queda el proveedor estándar de Flask.
+Los objetos que orjson no sabe serializar caen al camino estándar.
+
+Benchmark de tamaño y tiempo de serialización: python -m app.json_provider
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson usamos json de la stdlib
+    orjson = None
+
+_ORJSON_OPTS = 0
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider con orjson en el camino caliente (respuestas compactas)."""
+
+    sort_keys = False  # el front no depende del orden; ordenar solo cuesta
+
+    def _fast(self, obj: Any) -> bytes | None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTS)
+        except TypeError:
+            return None
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not kwargs or kwargs == {"separators": (",", ":")}:
+            out = self._fast(obj)
+            if out is not None:
+                return out.decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._fast(obj)
+        if body is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app) -> None:
+    """Activa FastJSONProvider si hay orjson (JSON_PROVIDER=stdlib lo desactiva)."""
+    choice = (os.getenv("JSON_PROVIDER") or "auto").strip().lower()
+    if orjson is not None and choice != "stdlib":
+        app.json_provider_class = FastJSONProvider
+        app.json = FastJSONProvider(app)
+
+
+# -----------------------------------------------------------------------------
+# Benchmark: python -m app.json_provider [anuncios]
+# -----------------------------------------------------------------------------
+def _bench(n_ads: int = 2000, repeat: int = 7) -> None:
+    import gzip
+    import random
+    import timeit
+
+    from app.compression import brotli
+
+    rnd = random.Random(11)
+
+    def fat_ad(i: int) -> dict:
+        # Forma que devolvía /get_ads (objeto Graph completo)
+        return {
+            "id": str(2_000_000 + i),
+            "name": f"Anuncio {i} — Promo limpieza dental",
+            "adset_id": str(3_000_000 + i // 10),
+            "status": "ACTIVE",
+            "effective_status": "ACTIVE",
+            "creative": {
+                "id": str(4_000_000 + i),
+                "thumbnail_url": f"https://scontent.xx.fbcdn.net/v/t45.1600-4/{i}_n.jpg?stp=dst-jpg_p64x64&_nc_cat=1&oh=00_{rnd.getrandbits(64):x}&oe=6790ABCD",
+                "asset_feed_spec": {
+                    "bodies": [{"text": "Agenda tu cita hoy. " * 6} for _ in range(3)],
+                    "titles": [{"text": f"Título {k}"} for k in range(4)],
+                    "images": [{"hash": f"{rnd.getrandbits(128):032x}"} for _ in range(5)],
+                    "call_to_action_types": ["MESSAGE_PAGE", "LEARN_MORE"],
+                    "ad_formats": ["SINGLE_IMAGE"],
+                },
+            },
+            "thumbnail_url": f"/thumb/{2_000_000 + i}",
+        }
+
+    def without_feed_spec(ad: dict) -> dict:
+        creative = {k: v for k, v in ad["creative"].items() if k != "asset_feed_spec"}
+        return {**ad, "creative": creative}
+
+    fat = {"data": [fat_ad(i) for i in range(n_ads)]}
+    slim = {"data": [without_feed_spec(a) for a in fat["data"]]}
+
+    def stdlib(obj: Any) -> bytes:
+        # Lo que hacía Flask por defecto (sort_keys + separators compactos)
+        return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    print(f"/get_ads con {n_ads} anuncios (mejor de {repeat})")
+    for label, payload in (("completo", fat), ("sin feed", slim)):
+        raw = stdlib(payload)
+        sizes = f"raw {len(raw) / 1024:8.1f} KB | gzip {len(gzip.compress(raw, 6)) / 1024:7.1f} KB"
+        if brotli is not None:
+            sizes += f" | br {len(brotli.compress(raw, quality=5)) / 1024:7.1f} KB"
+        t_std = min(timeit.repeat(lambda: stdlib(payload), number=1, repeat=repeat))
+        line = f"  {label:<10} {sizes} | json {t_std * 1000:6.2f} ms"
+        if orjson is not None:
+            t_or = min(timeit.repeat(lambda: orjson.dumps(payload, option=_ORJSON_OPTS), number=1, repeat=repeat))
+            line += f" | orjson {t_or * 1000:6.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,155 @@
+# app/registry.py
+"""
+Registro de clientas leído de clients.json (única fuente de verdad).
+
+- Se carga una vez y se indexa: slug -> clienta, cuenta (act_...) -> slug,
+  y listas ya ordenadas para paginar el overview.
+- Si cambia el mtime del archivo se recarga sin reiniciar (se revisa como
+  mucho cada CLIENTS_RELOAD_SECONDS).
+- Cada recarga arma un índice nuevo y lo reemplaza de una vez: quien esté
+  iterando sigue con la versión anterior.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CLIENTS_PATH = os.getenv("CLIENTS_PATH") or os.path.join(BASE_DIR, "clients.json")
+RELOAD_SECONDS = float(os.getenv("CLIENTS_RELOAD_SECONDS", "2") or 2)
+
+SORT_KEYS = ("order", "name", "slug")
+
+Client = Dict[str, Any]
+
+
+def normalize_account(acc: Any) -> str:
+    """'123' / 'act_123' / 123 -> 'act_123'."""
+    acc = str(acc or "").strip()
+    if not acc:
+        return ""
+    return acc if acc.startswith("act_") else f"act_{acc}"
+
+
+class _Index:
+    """Vista inmutable del registro en un momento dado."""
+
+    __slots__ = ("clients", "by_account", "sorted")
+
+    def __init__(self, raw: Dict[str, Any]) -> None:
+        clients: Dict[str, Client] = {}
+        by_account: Dict[str, str] = {}
+        for slug, info in (raw or {}).items():
+            if not isinstance(info, dict):
+                continue
+            accounts = [a for a in (normalize_account(x) for x in info.get("ad_account_ids") or []) if a]
+            client = {**info, "slug": info.get("slug") or slug, "ad_account_ids": accounts}
+            clients[slug] = client
+            for acc in accounts:
+                if acc in by_account and by_account[acc] != slug:
+                    logging.warning("[registry] Cuenta %s repetida en %s y %s", acc, by_account[acc], slug)
+                by_account.setdefault(acc, slug)
+
+        order = list(clients)
+        self.clients = clients
+        self.by_account = by_account
+        self.sorted = {
+            "order": order,
+            "slug": sorted(order),
+            "name": sorted(order, key=lambda s: (str(clients[s].get("client_name") or s).lower(), s)),
+        }
+
+
+class ClientRegistry:
+    def __init__(self, path: str, reload_seconds: float = RELOAD_SECONDS) -> None:
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._index = _Index({})
+        self._refresh(force=True)
+
+    # ------------------------ carga ------------------------
+
+    def _refresh(self, force: bool = False) -> _Index:
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_seconds:
+            return self._index
+        with self._lock:
+            if not force and now - self._checked < self.reload_seconds:
+                return self._index
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                if self._mtime is None:
+                    logging.error("[registry] No existe %s", self.path)
+                return self._index
+            if mtime == self._mtime:
+                return self._index
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+            except Exception:
+                # JSON a medio escribir o inválido: seguimos con la versión
+                # anterior y anotamos el mtime para no loguear en cada chequeo
+                # (se reintenta cuando el archivo vuelva a cambiar)
+                logging.exception("No se pudo leer %s", self.path)
+                self._mtime = mtime
+                return self._index
+            self._index = _Index(raw)
+            self._mtime = mtime
+            logging.info("[registry] %d clientas cargadas de %s", len(self._index.clients), self.path)
+            return self._index
+
+    def reload(self) -> None:
+        self._refresh(force=True)
+
+    # ------------------------ consultas ------------------------
+
+    def __contains__(self, slug: object) -> bool:
+        return slug in self._refresh().clients
+
+    def __len__(self) -> int:
+        return len(self._refresh().clients)
+
+    def get(self, slug: str) -> Optional[Client]:
+        return self._refresh().clients.get(slug)
+
+    def all(self) -> Dict[str, Client]:
+        """Dict slug -> clienta (no modificar)."""
+        return self._refresh().clients
+
+    def items(self) -> Iterator[Tuple[str, Client]]:
+        return iter(list(self._refresh().clients.items()))
+
+    def for_account(self, ad_account_id: Any) -> Optional[Tuple[str, Client]]:
+        """Clienta dueña de una cuenta publicitaria (con o sin 'act_')."""
+        idx = self._refresh()
+        slug = idx.by_account.get(normalize_account(ad_account_id))
+        return (slug, idx.clients[slug]) if slug else None
+
+    def page(
+        self, offset: int = 0, limit: Optional[int] = None, sort: str = "order"
+    ) -> Tuple[List[Tuple[str, Client]], int]:
+        """
+        Página de clientas ordenadas por 'order' (como en clients.json),
+        'name' o 'slug'; prefijo '-' invierte. Devuelve (página, total).
+        """
+        idx = self._refresh()
+        desc = sort.startswith("-")
+        key = sort.lstrip("-")
+        slugs = idx.sorted.get(key, idx.sorted["order"])
+        if desc:
+            slugs = slugs[::-1]
+        offset = max(0, offset)
+        end = len(slugs) if limit is None else offset + max(0, limit)
+        return [(s, idx.clients[s]) for s in slugs[offset:end]], len(slugs)
+
+
+registry = ClientRegistry(CLIENTS_PATH)
@@ -0,0 +1,168 @@
+# app/report_jobs.py
+"""
+Reportes asíncronos de Graph para rangos grandes.
+
+Un GET síncrono a /insights con meses de datos a nivel ad y time_increment=1
+puede pasar el límite de Graph y el timeout de la función en Vercel. En ese
+caso:
+  1) POST /{objeto}/insights           -> report_run_id
+  2) GET  /{report_run_id}             -> async_status / async_percent_completion
+  3) GET  /{report_run_id}/insights    -> filas (paginadas por cursor)
+
+El estado del job y las filas finales quedan en el caché JSON de utils,
+bajo una clave derivada de (objeto, parámetros). El front consulta el estado
+en /api/insights_jobs/<report_run_id>.
+
+El transporte se inyecta con configure() (routes usa fb_get/fb_post); un stub
+local puede simular todo el ciclo sin red.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils import read_cache, write_cache
+
+# Rango (en días) a partir del cual level=ad / time_increment van por job asíncrono
+ASYNC_RANGE_DAYS = int(os.getenv("FB_ASYNC_RANGE_DAYS", "31") or 31)
+# Vida de estados y resultados en caché
+JOB_TTL = int(os.getenv("FB_ASYNC_JOB_TTL", str(6 * 3600)) or 6 * 3600)
+PAGE_LIMIT = 500
+MAX_ROWS = 100_000
+
+STATUS_DONE = "done"
+STATUS_RUNNING = "running"
+STATUS_FAILED = "failed"
+# Esta instancia no conoce el job (el caché de /tmp es por instancia en
+# Vercel, o venció): el front repite la llamada original, que lo reutiliza
+# o lanza otro.
+STATUS_UNKNOWN = "unknown"
+
+_FAILED_ASYNC = ("Job Failed", "Job Skipped")
+
+Transport = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+_get: Optional[Transport] = None
+_post: Optional[Transport] = None
+
+
+def configure(get: Transport, post: Transport) -> None:
+    """Define cómo hablar con Graph (GET y POST). Ver routes.py."""
+    global _get, _post
+    _get, _post = get, post
+
+
+# -----------------------------------------------------------------------------
+# Claves y decisión sync/async
+# -----------------------------------------------------------------------------
+def job_key(object_id: str, params: Dict[str, Any]) -> str:
+    raw = json.dumps({"id": object_id, "params": params}, sort_keys=True, default=str)
+    return "report_" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def range_days(params: Dict[str, Any]) -> int:
+    """Días cubiertos por time_range (0 si se usa date_preset)."""
+    tr = params.get("time_range")
+    if not tr:
+        return 0
+    try:
+        tr = json.loads(tr) if isinstance(tr, str) else tr
+        since = date.fromisoformat(tr["since"])
+        until = date.fromisoformat(tr["until"])
+    except Exception:
+        return 0
+    return max(0, (until - since).days + 1)
+
+
+def needs_async(params: Dict[str, Any]) -> bool:
+    heavy = params.get("level") == "ad" or bool(params.get("time_increment"))
+    return heavy and range_days(params) > ASYNC_RANGE_DAYS
+
+
+# -----------------------------------------------------------------------------
+# Ciclo de vida
+# -----------------------------------------------------------------------------
+def cached_rows(key: str) -> Optional[List[Dict[str, Any]]]:
+    """Filas de un job terminado (o None si no hay/venció)."""
+    data = read_cache(f"{key}_rows", ttl_seconds=JOB_TTL)
+    if not isinstance(data, dict):
+        return None
+    return data.get("rows")
+
+
+def _save(job: Dict[str, Any]) -> Dict[str, Any]:
+    write_cache(f"{job['key']}_job", job)
+    return job
+
+
+def start(object_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Lanza (o reutiliza) el job para estos parámetros."""
+    key = job_key(object_id, params)
+    if cached_rows(key) is not None:
+        return {"id": None, "key": key, "status": STATUS_DONE, "percent": 100}
+
+    job = read_cache(f"{key}_job", ttl_seconds=JOB_TTL)
+    if job and job.get("status") == STATUS_RUNNING and job.get("id"):
+        return job  # mismo reporte ya corriendo: no lanzamos otro
+
+    j = _post(f"{object_id}/insights", params)
+    run_id = str(j.get("report_run_id") or "")
+    if not run_id:
+        logging.error("[report_jobs] Graph no devolvió report_run_id para %s", object_id)
+        return {"id": None, "key": key, "status": STATUS_FAILED, "percent": 0}
+
+    write_cache(f"reportrun_{run_id}", {"key": key})
+    return _save({"id": run_id, "key": key, "status": STATUS_RUNNING, "percent": 0})
+
+
+def _fetch_results(run_id: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    params: Dict[str, Any] = {"limit": PAGE_LIMIT}
+    while len(rows) < MAX_ROWS:
+        j = _get(f"{run_id}/insights", params)
+        if j.get("error"):
+            raise RuntimeError(f"Error leyendo resultados de {run_id}")
+        rows.extend(j.get("data") or [])
+        paging = j.get("paging") or {}
+        after = (paging.get("cursors") or {}).get("after")
+        if not paging.get("next") or not after:
+            break
+        params = {"limit": PAGE_LIMIT, "after": after}
+    return rows
+
+
+def status(run_id: str) -> Dict[str, Any]:
+    """
+    Consulta el job en Graph. Al completarse, pagina los resultados y los
+    deja en caché (la siguiente llamada a la ruta original los usa).
+    La clave sale solo de reportrun_<id>, que escribe start(): el cliente no
+    puede elegir dónde se guardan las filas.
+    """
+    key = (read_cache(f"reportrun_{run_id}", ttl_seconds=JOB_TTL) or {}).get("key")
+    if not key:
+        return {"id": run_id, "key": None, "status": STATUS_UNKNOWN, "percent": 0}
+    if cached_rows(key) is not None:
+        return {"id": run_id, "key": key, "status": STATUS_DONE, "percent": 100}
+
+    j = _get(run_id, {"fields": "async_status,async_percent_completion"})
+    async_status = j.get("async_status") or ""
+    percent = int(j.get("async_percent_completion") or 0)
+
+    if j.get("error") or async_status in _FAILED_ASYNC:
+        logging.error("[report_jobs] Job %s terminó con estado %r", run_id, async_status)
+        return _save({"id": run_id, "key": key, "status": STATUS_FAILED, "percent": percent})
+
+    if async_status != "Job Completed":
+        return _save({"id": run_id, "key": key, "status": STATUS_RUNNING, "percent": percent})
+
+    try:
+        rows = _fetch_results(run_id)
+    except Exception:
+        logging.exception("[report_jobs] No se pudieron leer resultados de %s", run_id)
+        return _save({"id": run_id, "key": key, "status": STATUS_FAILED, "percent": 100})
+
+    write_cache(f"{key}_rows", {"rows": rows})
+    return _save({"id": run_id, "key": key, "status": STATUS_DONE, "percent": 100, "rows": len(rows)})
@@ -3,25 +3,23 @@ from __future__ import annotations
 
 import os
 import json
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
-from flask import Blueprint, jsonify, render_template, request, abort
+from flask import Blueprint, Response, jsonify, render_template, request, abort, send_file, stream_with_context
+
+from app import report_jobs, thumbs
+from app.insights_agg import group_by_entity, metrics, parse_rows, per_row, totals
+from app.registry import SORT_KEYS, normalize_account, registry
+from app.utils import IS_VERCEL, read_cache, write_cache
 
 # -----------------------------------------------------------------------------
-# Config & data
+# Config & data (clientas: ver app/registry.py)
 # -----------------------------------------------------------------------------
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-CLIENTS_PATH = os.path.join(BASE_DIR, "clients.json")
-
-try:
-    with open(CLIENTS_PATH, "r", encoding="utf-8") as f:
-        CLIENTS: Dict[str, Any] = json.load(f)
-except Exception:
-    logging.exception("No se pudo leer clients.json")
-    CLIENTS = {}
-
 GRAPH_VERSION = os.getenv("FB_GRAPH_VERSION", "v21.0").strip()
 GRAPH_URL = f"https://graph.facebook.com/{GRAPH_VERSION}"
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "").strip()
@@ -34,17 +32,34 @@ bp = Blueprint("routes", __name__)
 # Consideramos ACTIVAS solo estas (excluimos PAUSED)
 ACTIVE_STATUSES = ("ACTIVE", "IN_PROCESS", "LIMITED")
 
+# Cuentas consultadas en paralelo por /api/overview/stream
+OVERVIEW_STREAM_WORKERS = max(1, int(os.getenv("OVERVIEW_STREAM_WORKERS", "8") or 8))
+# Tope de clientas por página en /api/overview(?limit=)
+OVERVIEW_MAX_LIMIT = 500
+
+# Prefetch de anuncios: top N campañas por gasto tras get_campaigns_active.
+# Corre en hilos que siguen después de responder; en Vercel la función se
+# congela al responder, así que ahí viene apagado y el prefetch lo hace el
+# front con /get_ads_by_campaigns (ver prefetchAds en dashboard.js).
+PREFETCH_TOP_N = max(0, int(os.getenv("PREFETCH_TOP_N", "0" if IS_VERCEL else "5") or 0))
+PREFETCH_WORKERS = max(1, int(os.getenv("PREFETCH_WORKERS", "4") or 4))
+ADS_CACHE_TTL = int(os.getenv("ADS_CACHE_TTL", "600") or 600)
+ADS_BATCH_MAX_IDS = 25
+
 
 # -----------------------------------------------------------------------------
 # Helpers Facebook API
 # -----------------------------------------------------------------------------
-def fb_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
-    """GET Graph API con manejo de errores."""
+def fb_request(method: str, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """GET/POST Graph API con manejo de errores."""
     url = f"{GRAPH_URL}/{path.lstrip('/')}"
     merged = {"access_token": ACCESS_TOKEN}
     merged.update(params or {})
     try:
-        r = requests.get(url, params=merged, timeout=35)
+        if method == "POST":
+            r = requests.post(url, data=merged, timeout=35)
+        else:
+            r = requests.get(url, params=merged, timeout=35)
         r.raise_for_status()
         return r.json()
     except requests.HTTPError:
@@ -52,7 +67,8 @@ def fb_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
             j = r.json()
             err = (j or {}).get("error", {})
             logging.error(
-                "[FB] %s -> type=%s code=%s sub=%s msg=%s",
+                "[FB] %s %s -> type=%s code=%s sub=%s msg=%s",
+                method,
                 r.url,
                 err.get("type"),
                 err.get("code"),
@@ -67,6 +83,17 @@ def fb_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
         return {"data": [], "error": True}
 
 
+def fb_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return fb_request("GET", path, params)
+
+
+def fb_post(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return fb_request("POST", path, params)
+
+
+report_jobs.configure(get=fb_get, post=fb_post)
+
+
 def fb_paginate_first_level(path: str, params: Dict[str, Any], limit: int = 500) -> List[Dict[str, Any]]:
     """Paginado simple (primer nivel)."""
     out: List[Dict[str, Any]] = []
@@ -92,31 +119,6 @@ def fb_paginate_first_level(path: str, params: Dict[str, Any], limit: int = 500)
     return out
 
 
-def sum_messages_from_actions(actions: Optional[List[Dict[str, Any]]]) -> float:
-    """Suma 'mensajes iniciados' (cubre variantes)."""
-    if not actions:
-        return 0.0
-    keys = {
-        "onsite_conversion.messaging_conversation_started_7d",
-        "onsite_conversion.messaging_conversation_started",
-    }
-    total = 0.0
-    for a in actions:
-        if a.get("action_type") in keys:
-            try:
-                total += float(a.get("value", 0) or 0)
-            except Exception:
-                pass
-    return total
-
-
-def f2(v: Any) -> float:
-    try:
-        return round(float(v or 0), 2)
-    except Exception:
-        return 0.0
-
-
 def build_date_params() -> Dict[str, Any]:
     """
     Soporta: ?date_preset=hoy|ayer|7d|mes_actual|mes_pasado|rango
@@ -147,22 +149,45 @@ def build_date_params() -> Dict[str, Any]:
     return params
 
 
+def fetch_insights(
+    object_id: str, params: Dict[str, Any], force_async: bool = False
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    Filas de /{object_id}/insights.
+    Rangos grandes (ver report_jobs.needs_async) o ?async=1 van por reporte
+    asíncrono: devuelve (None, job) mientras corre y (filas, None) cuando ya
+    están en caché. Si Graph no acepta el job, cae al GET síncrono.
+    """
+    if force_async or report_jobs.needs_async(params):
+        key = report_jobs.job_key(object_id, params)
+        rows = report_jobs.cached_rows(key)
+        if rows is not None:
+            return rows, None
+        job = report_jobs.start(object_id, params)
+        if job["status"] == report_jobs.STATUS_RUNNING:
+            return None, job
+        if job["status"] == report_jobs.STATUS_DONE:
+            return report_jobs.cached_rows(key) or [], None
+    j = fb_get(f"{object_id}/insights", params)
+    return j.get("data") or [], None
+
+
 # -----------------------------------------------------------------------------
 # Vistas HTML
 # -----------------------------------------------------------------------------
 @bp.route("/")
 def root():
-    return render_template("overview.html", clients=CLIENTS)
+    return render_template("overview.html", clients=registry.all())
 
 @bp.route("/overview")
 def overview():
-    return render_template("overview.html", clients=CLIENTS)
+    return render_template("overview.html", clients=registry.all())
 
 @bp.route("/dashboard/<client_id>")
 def dashboard(client_id: str):
-    if client_id not in CLIENTS:
+    info = registry.get(client_id)
+    if info is None:
         abort(404)
-    info = CLIENTS[client_id]
     return render_template(
         "index.html",
         client_id=client_id,
@@ -174,32 +199,151 @@ def dashboard(client_id: str):
 # -----------------------------------------------------------------------------
 # API: Overview (agregado por clienta)
 # -----------------------------------------------------------------------------
+def fetch_account_totals(acc: str, date_params: Dict[str, Any]) -> Tuple[float, float]:
+    """Gasto y mensajes de UNA cuenta en el rango (una llamada a insights)."""
+    j = fb_get(f"{normalize_account(acc)}/insights", {"fields": "spend,actions", **date_params})
+    return totals(parse_rows(j.get("data")))
+
+
+def overview_item(cid: str, info: Dict[str, Any], spend: float, msgs: float) -> Dict[str, Any]:
+    return {
+        "client_id": cid,
+        "client_name": info.get("client_name", cid),
+        **metrics(spend, msgs),
+    }
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formatea un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def overview_page() -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Página de clientas para el overview:
+      ?offset=0&limit=50&sort=order|name|slug (prefijo '-' = descendente)
+      ?client=<slug> -> solo esa clienta (p. ej. el KPI "Hoy" del dashboard)
+    Sin limit se devuelven todas (comportamiento anterior).
+    next_offset es None cuando no hay más (o la página vino vacía).
+    """
+    def int_arg(name: str) -> Optional[int]:
+        try:
+            return int(request.args.get(name, ""))
+        except ValueError:
+            return None
+
+    offset = max(0, int_arg("offset") or 0)
+    limit = int_arg("limit")
+    if limit is not None:
+        limit = min(max(limit, 0), OVERVIEW_MAX_LIMIT)
+    sort = (request.args.get("sort") or "order").strip()
+    if sort.lstrip("-") not in SORT_KEYS:
+        sort = "order"
+
+    slug = (request.args.get("client") or "").strip()
+    if slug:
+        info = registry.get(slug)
+        page, total = ([(slug, info)] if info else []), (1 if info else 0)
+        offset, limit = 0, None
+    else:
+        page, total = registry.page(offset, limit, sort)
+    end = offset + len(page)
+    paging = {
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "total": total,
+        "next_offset": end if page and end < total else None,
+    }
+    return page, paging
+
+
 @bp.route("/api/overview")
 def api_overview():
+    date_params = build_date_params()
+    page, paging = overview_page()
     items: List[Dict[str, Any]] = []
-    for cid, info in CLIENTS.items():
+    for cid, info in page:
         total_spend = 0.0
         total_msgs = 0.0
         for acc in (info.get("ad_account_ids") or []):
-            account = acc if str(acc).startswith("act_") else f"act_{acc}"
-            j = fb_get(
-                f"{account}/insights",
-                {"fields": "spend,actions", **build_date_params()},
+            spend, msgs = fetch_account_totals(acc, date_params)
+            total_spend += spend
+            total_msgs += msgs
+        items.append(overview_item(cid, info, total_spend, total_msgs))
+    return jsonify({"data": items, "paging": paging})
+
+
+@bp.route("/api/overview/stream")
+def api_overview_stream():
+    """
+    Igual que /api/overview, pero en streaming (SSE):
+      - event: client  -> una clienta en cuanto terminan TODAS sus cuentas
+      - event: summary -> totales al final
+    Las cuentas se consultan en paralelo; el primer card llega con la
+    latencia de una sola cuenta.
+    """
+    date_params = build_date_params()
+    clients, paging = overview_page()
+
+    def generate():
+        acc_totals: Dict[str, List[float]] = {}
+        pending: Dict[str, int] = {}
+        index: Dict[str, int] = {}
+        sum_spend = 0.0
+        sum_msgs = 0.0
+
+        def emit(cid: str, info: Dict[str, Any]) -> str:
+            nonlocal sum_spend, sum_msgs
+            spend, msgs = acc_totals[cid]
+            sum_spend += spend
+            sum_msgs += msgs
+            return sse_event("client", {**overview_item(cid, info, spend, msgs), "index": index[cid]})
+
+        # Hint de reconexión para EventSource (ms)
+        yield "retry: 10000\n\n"
+
+        pool = ThreadPoolExecutor(max_workers=OVERVIEW_STREAM_WORKERS)
+        try:
+            futures = {}
+            for i, (cid, info) in enumerate(clients):
+                accounts = info.get("ad_account_ids") or []
+                acc_totals[cid] = [0.0, 0.0]
+                pending[cid] = len(accounts)
+                index[cid] = paging["offset"] + i
+                if not accounts:
+                    yield emit(cid, info)
+                    continue
+                for acc in accounts:
+                    futures[pool.submit(fetch_account_totals, acc, date_params)] = cid
+
+            infos = dict(clients)
+            for fut in as_completed(futures):
+                cid = futures[fut]
+                try:
+                    spend, msgs = fut.result()
+                except Exception:
+                    logging.exception("[overview/stream] Falló cuenta de %s", cid)
+                    spend, msgs = 0.0, 0.0
+                acc_totals[cid][0] += spend
+                acc_totals[cid][1] += msgs
+                pending[cid] -= 1
+                if pending[cid] == 0:
+                    yield emit(cid, infos[cid])
+
+            yield sse_event(
+                "summary",
+                {"clients": len(clients), "paging": paging, **metrics(sum_spend, sum_msgs)},
             )
-            for r in (j.get("data") or []):
-                total_spend += f2(r.get("spend"))
-                total_msgs += sum_messages_from_actions(r.get("actions"))
-        cpr = f2(total_spend / total_msgs) if total_msgs > 0 else 0.0
-        items.append(
-            {
-                "client_id": cid,
-                "client_name": info.get("client_name", cid),
-                "spend": f2(total_spend),
-                "results": float(total_msgs),
-                "cpr": cpr,
-            }
-        )
-    return jsonify({"data": items})
+        finally:
+            # Si el navegador corta la conexión no seguimos pidiendo a Graph
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -----------------------------------------------------------------------------
@@ -211,7 +355,7 @@ def get_campaigns_active(ad_account_id: str):
     Devuelve SOLO campañas ACTIVAS con gasto > 0 en el rango.
     Usa /act_xxx/insights?level=campaign para velocidad.
     """
-    account = ad_account_id if ad_account_id.startswith("act_") else f"act_{ad_account_id}"
+    account = normalize_account(ad_account_id)
 
     # 1) Traer mapa id->status/name (para filtrar activas)
     camps = fb_paginate_first_level(
@@ -222,48 +366,57 @@ def get_campaigns_active(ad_account_id: str):
     name_map = {c["id"]: c.get("name") for c in camps}
 
     # 2) Métricas por campaña en UNA llamada
-    params = {"level": "campaign", "fields": "campaign_id,campaign_name,spend,actions", **build_date_params()}
+    date_params = build_date_params()
+    params = {"level": "campaign", "fields": "campaign_id,campaign_name,spend,actions", **date_params}
     ins = fb_get(f"{account}/insights", params)
 
+    rows = ins.get("data") or []
+    row_names = {r.get("campaign_id"): r.get("campaign_name") for r in rows}
+
     out: List[Dict[str, Any]] = []
-    for row in (ins.get("data") or []):
-        cid = row.get("campaign_id")
-        spend = f2(row.get("spend"))
-        msgs = sum_messages_from_actions(row.get("actions"))
-        if not cid or spend <= 0:
+    for g in group_by_entity(parse_rows(rows, id_field="campaign_id")):  # ya viene por gasto desc
+        cid = g["id"]
+        if g["spend"] <= 0:
             continue  # gasto 0 => no mostrar
         if status_map.get(cid, "") and not status_map[cid].startswith(ACTIVE_STATUSES):
             continue  # no activa => no mostrar
-        cpr = f2(spend / msgs) if msgs > 0 else 0.0
-        out.append(
-            {
-                "id": cid,
-                "name": name_map.get(cid) or row.get("campaign_name") or cid,
-                "spend": spend,
-                "results": float(msgs),
-                "cpr": cpr,
-            }
-        )
+        out.append({**g, "name": name_map.get(cid) or row_names.get(cid) or cid})
 
-    out.sort(key=lambda x: x.get("spend", 0), reverse=True)
+    # 3) Lo más probable es que abran las campañas con más gasto: dejamos
+    #    sus anuncios listos en caché (ver /get_ads_by_campaigns). Solo si el
+    #    front lo pide (?prefetch=1): el KPI "Ayer" usa esta misma ruta.
+    if request.args.get("prefetch") == "1":
+        prefetch_ads([c["id"] for c in out[:PREFETCH_TOP_N]], date_params)
     return jsonify({"data": out})
 
 
 # -----------------------------------------------------------------------------
 # API rápida: miniaturas (ads) con gasto > 0 de una campaña
 # -----------------------------------------------------------------------------
-@bp.route("/get_ads_by_campaign/<campaign_id>")
-def get_ads_by_campaign(campaign_id: str):
+def build_ads_payload(
+    campaign_id: str, date_params: Dict[str, Any], force_async: bool = False
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
     """
-    Devuelve SOLO anuncios con gasto > 0 del rango.
+    Anuncios con gasto > 0 de una campaña en el rango (sin request: se usa
+    también desde el prefetch). Devuelve (anuncios, None) o (None, job) si
+    el rango va por reporte asíncrono y aún no termina.
     Une:
-      - /campaign_id/ads (para nombre + thumbnail)
       - /campaign_id/insights?level=ad (para métricas)  → sin iterar por ad
+      - /campaign_id/ads (para nombre + thumbnail)
     """
-    # 1) Anuncios (para thumbnail & nombre)
+    # 1) Métricas a nivel ad para TODO en UNA llamada (o job asíncrono si el rango es grande)
+    rows, job = fetch_insights(
+        campaign_id,
+        {"level": "ad", "fields": "ad_id,ad_name,spend,actions", **date_params},
+        force_async=force_async,
+    )
+    if job:
+        return None, job
+
+    # 2) Anuncios (para thumbnail & nombre)
     ads = fb_paginate_first_level(
         f"{campaign_id}/ads",
-        {"fields": "id,name,effective_status,creative{thumbnail_url}", "limit": 500},
+        {"fields": "id,name,effective_status,creative{id,thumbnail_url}", "limit": 500},
     )
     meta: Dict[str, Dict[str, Any]] = {}
     for a in ads:
@@ -274,20 +427,15 @@ def get_ads_by_campaign(campaign_id: str):
             "name": a.get("name"),
             "status": str(a.get("effective_status", "")).upper(),
             "thumb": (a.get("creative") or {}).get("thumbnail_url"),
+            "creative_id": (a.get("creative") or {}).get("id"),
         }
 
-    # 2) Métricas a nivel ad para TODO en UNA llamada
-    ins = fb_get(
-        f"{campaign_id}/insights",
-        {"level": "ad", "fields": "ad_id,ad_name,spend,actions", **build_date_params()},
-    )
+    row_names = {r.get("ad_id"): r.get("ad_name") for r in rows}
 
     out: List[Dict[str, Any]] = []
-    for row in (ins.get("data") or []):
-        aid = row.get("ad_id")
-        spend = f2(row.get("spend"))
-        msgs = sum_messages_from_actions(row.get("actions"))
-        if not aid or spend <= 0:
+    for g in group_by_entity(parse_rows(rows, id_field="ad_id")):  # ya viene por gasto desc
+        aid = g["id"]
+        if g["spend"] <= 0:
             continue  # mostrar solo con gasto
         info = meta.get(aid, {})
         # (opcional) si quieres filtrar ads inactivos, descomenta:
@@ -295,25 +443,147 @@ def get_ads_by_campaign(campaign_id: str):
         #     continue
         out.append(
             {
-                "id": aid,
-                "name": info.get("name") or row.get("ad_name") or aid,
-                "thumbnail_url": info.get("thumb"),
-                "spend": spend,
-                "results": float(msgs),
-                "cpr": f2(spend / msgs) if msgs > 0 else 0.0,
+                **g,
+                "name": info.get("name") or row_names.get(aid) or aid,
+                "thumbnail_url": thumb_proxy_url(aid, info.get("thumb"), info.get("creative_id")),
             }
         )
 
-    out.sort(key=lambda x: x.get("spend", 0), reverse=True)
-    return jsonify({"data": out})
+    # Descarga/reduce en segundo plano las miniaturas que se van a mostrar
+    thumbs.warm((ad["id"], meta.get(ad["id"], {}).get("thumb")) for ad in out)
+    return out, None
+
+
+def ads_cache_key(campaign_id: str, date_params: Dict[str, Any]) -> str:
+    raw = json.dumps(date_params, sort_keys=True, default=str)
+    return f"ads_{campaign_id}_{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _load_ads(
+    campaign_id: str, date_params: Dict[str, Any], force_async: bool
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Anuncios desde caché o armados de Graph (y guardados en caché)."""
+    key = ads_cache_key(campaign_id, date_params)
+    cached = read_cache(key, ttl_seconds=ADS_CACHE_TTL)
+    if isinstance(cached, list):
+        return cached, None
+    ads, job = build_ads_payload(campaign_id, date_params, force_async)
+    if ads is not None:
+        write_cache(key, ads)
+    return ads, job
+
+
+# Cargas en curso por (campaña, rango), sean del prefetch o de un request:
+# quien llega después espera la misma carga en vez de repetirla.
+_ads_inflight: Dict[str, Future] = {}
+_ads_lock = threading.RLock()
+# Solo para el prefetch especulativo: los clics del usuario no hacen cola aquí
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="ads-prefetch")
+
+
+def _forget(key: str, fut: Future) -> None:
+    with _ads_lock:
+        if _ads_inflight.get(key) is fut:
+            del _ads_inflight[key]
+
+
+def load_ads(
+    campaign_id: str, date_params: Dict[str, Any], force_async: bool = False
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    (anuncios, job) de una campaña, cargados en el hilo que llama.
+    Si ya hay una carga en curso para la misma campaña y rango se espera esa;
+    un prefetch que todavía está en cola se cancela y se hace aquí mismo.
+    """
+    key = ads_cache_key(campaign_id, date_params)
+    with _ads_lock:
+        fut = _ads_inflight.get(key)
+        if fut is not None and fut.cancel():
+            fut = None  # prefetch sin empezar: no esperamos la cola
+        owner = fut is None
+        if owner:
+            fut = Future()
+            fut.set_running_or_notify_cancel()  # ya corriendo: nadie más la cancela
+            _ads_inflight[key] = fut
+    if not owner:
+        return fut.result()
+
+    try:
+        result = _load_ads(campaign_id, date_params, force_async)
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    else:
+        fut.set_result(result)
+        return result
+    finally:
+        _forget(key, fut)
+
+
+def prefetch_ads(campaign_ids: List[str], date_params: Dict[str, Any]) -> None:
+    """Calienta en segundo plano el caché de anuncios de estas campañas."""
+    for cid in campaign_ids:
+        key = ads_cache_key(cid, date_params)
+        if read_cache(key, ttl_seconds=ADS_CACHE_TTL) is not None:
+            continue
+        with _ads_lock:
+            if key in _ads_inflight:
+                continue
+            fut = _prefetch_pool.submit(_load_ads, cid, date_params, False)
+            _ads_inflight[key] = fut
+        fut.add_done_callback(lambda f, key=key: _forget(key, f))
+
+
+@bp.route("/get_ads_by_campaign/<campaign_id>")
+def get_ads_by_campaign(campaign_id: str):
+    """Devuelve SOLO anuncios con gasto > 0 del rango (ver build_ads_payload)."""
+    force_async = request.args.get("async") == "1"
+    ads, job = load_ads(campaign_id, build_date_params(), force_async)
+    if job:
+        return jsonify({"data": [], "job": job}), 202
+    return jsonify({"data": ads})
+
+
+@bp.route("/get_ads_by_campaigns")
+def get_ads_by_campaigns():
+    """
+    Lote: ?ids=c1,c2,... -> {"data": {campaign_id: [anuncios]}, "jobs": {...}}
+    Cargas en paralelo dentro de este request; las que ya están en caché o en
+    curso (prefetch u otro request) no se repiten.
+    """
+    raw_ids = [i.strip() for i in (request.args.get("ids") or "").split(",")]
+    ids = [i for i in dict.fromkeys(raw_ids) if i.isdigit()][:ADS_BATCH_MAX_IDS]
+    date_params = build_date_params()
+    force_async = request.args.get("async") == "1"
+
+    data: Dict[str, List[Dict[str, Any]]] = {}
+    jobs: Dict[str, Dict[str, Any]] = {}
+    if not ids:
+        return jsonify({"data": data, "jobs": jobs})
+
+    with ThreadPoolExecutor(max_workers=min(len(ids), PREFETCH_WORKERS)) as pool:
+        futures = {cid: pool.submit(load_ads, cid, date_params, force_async) for cid in ids}
+        for cid, fut in futures.items():
+            try:
+                ads, job = fut.result()
+            except Exception:
+                logging.exception("[ads] Falló carga de campaña %s", cid)
+                continue
+            if job:
+                jobs[cid] = job
+            else:
+                data[cid] = ads or []
+    return jsonify({"data": data, "jobs": jobs})
 
 
 # -----------------------------------------------------------------------------
 # Compat (rutas antiguas todavía usadas desde el front)
 # -----------------------------------------------------------------------------
+# Devuelven lo que manda Graph para estos campos. De creative solo se pide
+# id + thumbnail_url (antes también asset_feed_spec, el único blob grande).
 @bp.route("/get_campaigns/<ad_account_id>")
 def get_campaigns(ad_account_id: str):
-    account = ad_account_id if ad_account_id.startswith("act_") else f"act_{ad_account_id}"
+    account = normalize_account(ad_account_id)
     data = fb_paginate_first_level(
         f"{account}/campaigns",
         {"fields": "id,name,status,effective_status,objective,updated_time", "limit": 200},
@@ -332,14 +602,12 @@ def get_adsets(campaign_id: str):
 def get_ads(adset_id: str):
     data = fb_paginate_first_level(
         f"{adset_id}/ads",
-        {"fields": "id,name,adset_id,creative{thumbnail_url,asset_feed_spec},status,effective_status", "limit": 200},
+        {"fields": "id,name,adset_id,creative{id,thumbnail_url},status,effective_status", "limit": 200},
     )
-    out = []
     for ad in data:
         creative = ad.get("creative") or {}
-        ad["thumbnail_url"] = creative.get("thumbnail_url")
-        out.append(ad)
-    return jsonify({"data": out})
+        ad["thumbnail_url"] = thumb_proxy_url(ad.get("id"), creative.get("thumbnail_url"), creative.get("id"))
+    return jsonify({"data": data})
 
 @bp.route("/get_insights/campaign/<campaign_id>")
 def get_insights_campaign(campaign_id: str):
@@ -348,35 +616,91 @@ def get_insights_campaign(campaign_id: str):
     if request.args.get("time_increment"):
         params["time_increment"] = request.args.get("time_increment")
 
-    j = fb_get(f"{campaign_id}/insights", params)
-    rows = j.get("data", []) or []
-
-    out_rows = []
-    total_spend = 0.0
-    total_msgs = 0.0
-    for r in rows:
-        spend = f2(r.get("spend"))
-        msgs = sum_messages_from_actions(r.get("actions"))
-        total_spend += spend
-        total_msgs += msgs
-        out_rows.append(
-            {
-                "date_start": r.get("date_start"),
-                "date_stop": r.get("date_stop"),
-                "spend": spend,
-                "results": msgs,
-                "cpr": f2(spend / msgs) if msgs > 0 else 0.0,
-            }
-        )
+    rows, job = fetch_insights(campaign_id, params, force_async=request.args.get("async") == "1")
+    if job:
+        return jsonify({"data": [], "summary": None, "job": job}), 202
+
+    frame = parse_rows(rows)
+    cols = {k: v.tolist() for k, v in per_row(frame).items()}
+    out_rows = [
+        {
+            "date_start": r.get("date_start"),
+            "date_stop": r.get("date_stop"),
+            "spend": cols["spend"][i],
+            "results": cols["results"][i],
+            "cpr": cols["cpr"][i],
+        }
+        for i, r in enumerate(rows)
+    ]
 
-    summary = {
-        "spend": f2(total_spend),
-        "results": float(total_msgs),
-        "cpr": f2(total_spend / total_msgs) if total_msgs > 0 else 0.0,
-    }
+    summary = metrics(*totals(frame))
     return jsonify({"data": out_rows, "summary": summary})
 
 
+# -----------------------------------------------------------------------------
+# API: estado de reportes asíncronos (el front hace polling)
+# -----------------------------------------------------------------------------
+@bp.route("/api/insights_jobs/<report_run_id>")
+def api_insights_job(report_run_id: str):
+    """
+    Estado de un job de /insights: running | done | failed | unknown (+ percent).
+    Con 'done' las filas ya están en caché: basta repetir la llamada original.
+    Con 'unknown' también: la ruta original reutiliza o relanza el job.
+    """
+    if not report_run_id.isdigit():
+        abort(404)
+    return jsonify(report_jobs.status(report_run_id))
+
+
+# -----------------------------------------------------------------------------
+# Miniaturas: proxy con caché local (ver app/thumbs.py)
+# -----------------------------------------------------------------------------
+# Con ?v=<hash> la URL cambia junto con la imagen: se cachea un año (immutable).
+# Sin versión (aún no descargada) solo un rato, revalidando con ETag.
+THUMB_MAX_AGE = 365 * 24 * 3600
+THUMB_REVALIDATE_AGE = int(os.getenv("THUMB_REVALIDATE_AGE", "300") or 300)
+
+
+def thumb_proxy_url(
+    ad_id: Optional[str], source_url: Optional[str], creative_id: Optional[str] = None
+) -> Optional[str]:
+    """Registra la URL original de Meta y devuelve /thumb/<ad_id>[?v=<hash>]."""
+    if not ad_id or not source_url:
+        return None
+    thumbs.remember_source(ad_id, source_url, creative_id)
+    v = thumbs.version(ad_id)
+    return f"/thumb/{ad_id}?v={v}" if v else f"/thumb/{ad_id}"
+
+
+def resolve_thumb_url(ad_id: str) -> Optional[str]:
+    """Pide a Graph una thumbnail_url fresca (las firmadas caducan)."""
+    j = fb_get(ad_id, {"fields": "creative{id,thumbnail_url}"})
+    creative = j.get("creative") or {}
+    url = creative.get("thumbnail_url")
+    thumbs.remember_source(ad_id, url, creative.get("id"))
+    return url
+
+
+@bp.route("/thumb/<ad_id>")
+def thumb(ad_id: str):
+    if not ad_id.isdigit():
+        abort(404)
+    entry = thumbs.get(ad_id, resolve=resolve_thumb_url)
+    if not entry:
+        abort(404)
+    versioned = request.args.get("v") == entry["hash"][:16]
+    resp = send_file(
+        entry["path"],
+        mimetype=entry["mime"],
+        etag=entry["hash"],
+        max_age=THUMB_MAX_AGE if versioned else THUMB_REVALIDATE_AGE,
+        conditional=True,
+    )
+    resp.cache_control.public = True
+    resp.cache_control.immutable = versioned
+    return resp
+
+
 # -----------------------------------------------------------------------------
 # Errores
 # -----------------------------------------------------------------------------
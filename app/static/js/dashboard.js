@@ -7,6 +7,15 @@
   let currentUntil = "";
   let currentCampaign = null;
 
+  // Lote de anuncios de las campañas con más gasto (ver prefetchAds)
+  const PREFETCH_TOP_N = 5;
+  let adsBatch = null; // { q, ids:Set, promise } del último lote pedido
+
+  // Caché cliente (DataLayer): "hoy" cambia rápido, el resto casi no
+  const TTL_TODAY = 2 * 60 * 1000;
+  const TTL_PAST = 10 * 60 * 1000;
+  const ttlFor = (preset) => (preset === "hoy" ? TTL_TODAY : TTL_PAST);
+
   // --------- Helpers DOM ----------
   const $ = (sel) => document.querySelector(sel);
   const kpiSpendTotal       = $("#kpiSpendTotal");
@@ -37,11 +46,70 @@
   }
 
   // --------- Fetch helpers ----------
-  async function fetchJSON(url) {
-    const r = await fetch(url);
-    return r.json();
+  const JOB_POLL_MS = 2000;
+  const JOB_MAX_POLLS = 150; // ~5 min
+  const sleep = (ms) => new Promise((res) => setTimeout(res, ms));
+
+  // Rangos grandes: el backend responde 202 + job (reporte asíncrono de Graph).
+  // Consultamos el estado hasta "done" y repetimos la llamada (ya cacheada).
+  // "unknown": el polling cayó en otra instancia que no conoce el job; también
+  // repetimos la llamada original, que lo reutiliza o lo vuelve a lanzar.
+  // Devuelve el status final ("done" | "unknown" | "failed").
+  // superseded(): true si otro pedido del mismo canal ya reemplazó a este;
+  // en ese caso se deja de consultar y se rechaza con AbortError.
+  async function waitForJob(job, superseded = () => false) {
+    for (let i = 0; i < JOB_MAX_POLLS; i++) {
+      await sleep(JOB_POLL_MS);
+      if (superseded()) throw abortError();
+      const st = await DataLayer.getJSON(`/api/insights_jobs/${encodeURIComponent(job.id)}`, { force: true, persist: false });
+      if (st.status !== "running") return st.status;
+    }
+    return "failed";
+  }
+
+  const JOB_MAX_RESTARTS = 3;
+
+  // Último pedido por canal de DataLayer: un job de un pedido reemplazado
+  // (otra campaña u otro preset) deja de consultarse.
+  const channelSeq = new Map();
+
+  const abortError = () => {
+    const err = new Error("Pedido reemplazado");
+    err.name = "AbortError";
+    return err;
+  };
+
+  // opts: ver DataLayer.getJSON (ttl, channel...). Un pedido reemplazado en
+  // el mismo canal rechaza con AbortError (los llamadores lo ignoran).
+  // Si el reporte falla, rechaza con Error (los llamadores muestran el aviso).
+  async function fetchJSON(url, opts = {}) {
+    const options = { ttl: ttlFor(currentPreset), ...opts };
+    const channel = options.channel;
+    const seq = channel ? (channelSeq.get(channel) || 0) + 1 : 0;
+    if (channel) channelSeq.set(channel, seq);
+    const superseded = () => !!channel && channelSeq.get(channel) !== seq;
+
+    let data = await DataLayer.getJSON(url, options);
+    for (let restarts = 0; data && data.job && data.job.status === "running" && data.job.id; ) {
+      const status = await waitForJob(data.job, superseded);
+      if (superseded()) throw abortError();
+      if (status === "failed") throw new Error("El reporte de Facebook falló");
+      if (status === "unknown" && ++restarts > JOB_MAX_RESTARTS) throw new Error("No se pudo seguir el reporte");
+      data = await DataLayer.getJSON(url, { ...options, channel: null });
+    }
+    return data;
   }
 
+  function renderError(el, text) {
+    el.innerHTML = "";
+    const box = document.createElement("div");
+    box.className = "load-error";
+    box.textContent = text;
+    el.appendChild(box);
+  }
+
+  const adsUrl = (campaignId, q) => `/get_ads_by_campaign/${encodeURIComponent(campaignId)}?${q}`;
+
   function buildQuery(extra = {}) {
     const q = new URLSearchParams();
     q.set("date_preset", currentPreset);
@@ -111,7 +179,7 @@
       card.className = "thumb-card ad-thumb";
       card.innerHTML = `
         <div class="thumb-img">
-          <img src="${ad.thumbnail_url || "/static/img/placeholder.png"}" alt="${(ad.name||"Anuncio")}" />
+          <img src="${ad.thumbnail_url || "/static/img/placeholder.png"}" alt="${(ad.name||"Anuncio")}" loading="lazy" decoding="async" />
         </div>
         <div class="thumb-info">
           <div class="name">${ad.name || ad.id}</div>
@@ -136,15 +204,27 @@
       return;
     }
     const q = buildQuery();
-    const data = await fetchJSON(`/get_campaigns_active/${encodeURIComponent(acc)}?${q}`);
-    const rows = (data && data.data) || [];
+    let rows;
+    try {
+      // prefetch=1: el backend precarga anuncios de las top campañas (la
+      // llamada del KPI "Ayer" de abajo no lo pide)
+      const url = `/get_campaigns_active/${encodeURIComponent(acc)}?${buildQuery({ prefetch: "1" })}`;
+      const data = await fetchJSON(url, { channel: "campaigns" });
+      rows = (data && data.data) || [];
+    } catch (e) {
+      if (DataLayer.isAbort(e)) return; // otro preset ya pidió lo suyo
+      if (q === buildQuery()) renderError(listEl, "No se pudieron cargar las campañas. Intenta nuevamente.");
+      return;
+    }
+    if (q !== buildQuery()) return; // respuesta de un preset anterior
     renderKpisFromCampaigns(rows);
+    prefetchAds(rows);
     renderCampaigns(rows);
 
     // Carga “Ayer” (si estamos en hoy, lo calculamos aparte para mostrar ese KPI)
     try {
       const qYesterday = new URLSearchParams({ date_preset: "ayer" }).toString();
-      const yd = await fetchJSON(`/get_campaigns_active/${encodeURIComponent(acc)}?${qYesterday}`);
+      const yd = await fetchJSON(`/get_campaigns_active/${encodeURIComponent(acc)}?${qYesterday}`, { ttl: TTL_PAST });
       const yrows = (yd && yd.data) || [];
       const yres = yrows.reduce((a, r) => a + (Number(r.results) || 0), 0);
       kpiYesterdayResults.textContent = `${yres}`;
@@ -153,10 +233,51 @@
     }
   }
 
+  // Pide en UN lote los anuncios de las campañas con más gasto
+  // (el backend ya los está precargando tras /get_campaigns_active)
+  // Cada campaña del lote queda en DataLayer bajo su URL individual, así
+  // loadThumbsForCampaign la encuentra sin pedir nada más.
+  // La primera campaña queda fuera: se selecciona sola y se pide aparte por
+  // el canal "ads", sin esperar a que termine todo el lote.
+  function prefetchAds(rows) {
+    const q = buildQuery();
+    const ttl = ttlFor(currentPreset);
+    const candidates = rows.slice(1, PREFETCH_TOP_N).map(r => String(r.id));
+    if (!candidates.length) {
+      adsBatch = null;
+      return;
+    }
+    const promise = (async () => {
+      const cached = await Promise.all(candidates.map(id => DataLayer.cached(adsUrl(id, q))));
+      const ids = candidates.filter((_, i) => cached[i] === null);
+      if (!ids.length) return;
+      const data = await fetchJSON(
+        `/get_ads_by_campaigns?${buildQuery({ ids: ids.join(",") })}`,
+        { channel: "ads-batch", persist: false }
+      );
+      Object.entries((data && data.data) || {}).forEach(([id, ads]) => DataLayer.put(adsUrl(id, q), { data: ads }, ttl));
+    })().catch(() => {});
+    // Se asigna antes de renderCampaigns (por si eligen otra campaña enseguida)
+    adsBatch = { q, ids: new Set(candidates), promise };
+  }
+
   async function loadThumbsForCampaign(campaignId) {
     const q = buildQuery();
-    const data = await fetchJSON(`/get_ads_by_campaign/${encodeURIComponent(campaignId)}?${q}`);
-    renderThumbs((data && data.data) || []);
+    if (adsBatch && adsBatch.q === q && adsBatch.ids.has(String(campaignId))) {
+      await adsBatch.promise;
+    }
+    let data;
+    try {
+      data = await fetchJSON(adsUrl(campaignId, q), { channel: "ads" });
+    } catch (e) {
+      if (DataLayer.isAbort(e)) return; // eligieron otra campaña
+      if (currentCampaign === campaignId && q === buildQuery()) {
+        renderError(thumbsEl, "No se pudieron cargar los anuncios. Intenta nuevamente.");
+      }
+      return;
+    }
+    // Si mientras tanto cambió la campaña o el preset, no pisamos lo nuevo
+    if (currentCampaign === campaignId && q === buildQuery()) renderThumbs((data && data.data) || []);
   }
 
   // --------- Eventos ----------
@@ -210,8 +331,8 @@
 
   async function setTodayResults() {
     try {
-      const res = await fetch('/api/overview?date_preset=today');
-      const json = await res.json();
+      // Solo esta clienta: el backend no consulta las cuentas de las demás
+      const json = await DataLayer.getJSON(`/api/overview?date_preset=today&client=${encodeURIComponent(CLIENT_ID)}`, { ttl: 2 * 60 * 1000 });
       const item = (json.data || []).find(x => x.client_id === CLIENT_ID);
       const todayResults = item ? item.results : 0;
 
@@ -242,8 +363,8 @@
 
   async function fetchTodayResults() {
     try {
-      const r = await fetch('/api/overview?date_preset=today', { cache: 'no-store' });
-      const j = await r.json();
+      // Mismo URL que el bloque anterior: DataLayer comparte una sola llamada
+      const j = await DataLayer.getJSON(`/api/overview?date_preset=today&client=${encodeURIComponent(CLIENT_ID)}`, { ttl: 2 * 60 * 1000 });
       const item = (j.data || []).find(x => x.client_id === CLIENT_ID);
       return item ? Number(item.results || 0) : 0;
     } catch {
@@ -0,0 +1,195 @@
+// app/static/js/datalayer.js
+// Capa de datos compartida por dashboard.js y overview.js (window.DataLayer):
+//  - deduplica fetch idénticos en vuelo (mismo URL => una sola llamada)
+//  - caché con TTL en memoria + IndexedDB, por URL (incluye la query de buildQuery)
+//  - cancela pedidos reemplazados: un pedido nuevo en el mismo "canal"
+//    aborta el anterior (AbortController) si nadie más lo está esperando
+// Las respuestas que no son 200 (errores, 202 de reportes asíncronos) no se cachean.
+
+(function () {
+  const DB_NAME = "dashboard-cache";
+  const STORE = "responses";
+  const DEFAULT_TTL = 2 * 60 * 1000;
+  const MAX_MEMORY = 200;
+
+  const memory = new Map();   // url -> { t, ttl, data }
+  const inflight = new Map(); // url -> { promise, controller, refs }
+  const channels = new Map(); // canal -> ticket del último pedido
+
+  const now = () => Date.now();
+  const fresh = (e) => !!e && now() - e.t < e.ttl;
+
+  const abortError = () => {
+    try {
+      return new DOMException("Pedido reemplazado", "AbortError");
+    } catch (e) {
+      const err = new Error("Pedido reemplazado");
+      err.name = "AbortError";
+      return err;
+    }
+  };
+  const isAbort = (e) => !!e && e.name === "AbortError";
+
+  // ---------- IndexedDB (opcional: sin él solo memoria) ----------
+  let dbPromise = null;
+
+  function openDB() {
+    if (dbPromise) return dbPromise;
+    dbPromise = new Promise((resolve) => {
+      if (!window.indexedDB) return resolve(null);
+      try {
+        const req = indexedDB.open(DB_NAME, 1);
+        req.onupgradeneeded = () => req.result.createObjectStore(STORE);
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => resolve(null);
+        req.onblocked = () => resolve(null);
+      } catch (e) {
+        resolve(null); // modo privado / bloqueado
+      }
+    });
+    return dbPromise;
+  }
+
+  async function idb(mode, fn) {
+    const db = await openDB();
+    if (!db) return null;
+    return new Promise((resolve) => {
+      try {
+        const req = fn(db.transaction(STORE, mode).objectStore(STORE));
+        req.onsuccess = () => resolve(req.result ?? null);
+        req.onerror = () => resolve(null);
+      } catch (e) {
+        resolve(null);
+      }
+    });
+  }
+
+  // Borra entradas vencidas (una vez por carga de página)
+  async function purgeStale() {
+    const keys = (await idb("readonly", (s) => s.getAllKeys())) || [];
+    for (const k of keys) {
+      const e = await idb("readonly", (s) => s.get(k));
+      if (!fresh(e)) idb("readwrite", (s) => s.delete(k));
+    }
+  }
+
+  // ---------- Caché ----------
+  function put(url, data, ttl = DEFAULT_TTL, persist = true) {
+    const entry = { t: now(), ttl, data };
+    memory.delete(url);
+    memory.set(url, entry);
+    if (memory.size > MAX_MEMORY) memory.delete(memory.keys().next().value);
+    if (persist) idb("readwrite", (s) => s.put(entry, url));
+  }
+
+  async function cached(url) {
+    const m = memory.get(url);
+    if (fresh(m)) return m.data;
+    const e = await idb("readonly", (s) => s.get(url));
+    if (fresh(e)) {
+      memory.set(url, e);
+      return e.data;
+    }
+    return null;
+  }
+
+  async function invalidate(prefix = "") {
+    Array.from(memory.keys())
+      .filter((k) => k.startsWith(prefix))
+      .forEach((k) => memory.delete(k));
+    const keys = (await idb("readonly", (s) => s.getAllKeys())) || [];
+    keys.filter((k) => String(k).startsWith(prefix)).forEach((k) => idb("readwrite", (s) => s.delete(k)));
+  }
+
+  // ---------- Fetch compartido ----------
+  function shared(url) {
+    let entry = inflight.get(url);
+    if (!entry) {
+      const controller = new AbortController();
+      entry = { controller, refs: 0, promise: null };
+      const self = entry;
+      entry.promise = fetch(url, { signal: controller.signal })
+        .then(async (r) => ({ ok: r.ok, status: r.status, data: await r.json() }))
+        .finally(() => {
+          if (inflight.get(url) === self) inflight.delete(url);
+        });
+      inflight.set(url, entry);
+    }
+    entry.refs += 1;
+
+    const self = entry;
+    let released = false;
+    // abort=false cuando ya terminó: solo descontamos la referencia
+    const release = (abort = true) => {
+      if (released) return;
+      released = true;
+      self.refs -= 1;
+      if (abort && self.refs <= 0) {
+        // Nadie más lo espera: lo sacamos y cortamos la descarga
+        if (inflight.get(url) === self) inflight.delete(url);
+        self.controller.abort();
+      }
+    };
+    return { promise: entry.promise, release };
+  }
+
+  function cancel(channel) {
+    const ticket = channels.get(channel);
+    if (ticket) {
+      channels.delete(channel);
+      ticket.cancel();
+    }
+  }
+
+  // getJSON(url, { ttl, channel, persist, force }) -> Promise<data>
+  //  - channel: un pedido nuevo en el mismo canal rechaza el anterior con AbortError
+  //  - force: ignora el caché (pero igual deduplica)
+  function getJSON(url, opts = {}) {
+    const { ttl = DEFAULT_TTL, channel = null, persist = true, force = false } = opts;
+    if (channel) cancel(channel);
+
+    return new Promise((resolve, reject) => {
+      const ticket = {
+        cancelled: false,
+        release: null,
+        cancel() {
+          ticket.cancelled = true;
+          if (ticket.release) ticket.release();
+          reject(abortError());
+        },
+      };
+      if (channel) channels.set(channel, ticket);
+      const finish = () => {
+        if (channel && channels.get(channel) === ticket) channels.delete(channel);
+      };
+
+      (async () => {
+        if (!force) {
+          const hit = await cached(url);
+          if (ticket.cancelled) return;
+          if (hit !== null) {
+            finish();
+            resolve(hit);
+            return;
+          }
+        }
+        const { promise, release } = shared(url);
+        ticket.release = release;
+        const res = await promise;
+        release(false);
+        if (ticket.cancelled) return;
+        if (res.status === 200) put(url, res.data, ttl, persist);
+        finish();
+        resolve(res.data);
+      })().catch((e) => {
+        if (ticket.cancelled) return;
+        finish();
+        reject(e);
+      });
+    });
+  }
+
+  window.DataLayer = { getJSON, cached, put, invalidate, cancel, isAbort };
+
+  setTimeout(purgeStale, 3000);
+})();
@@ -39,7 +39,7 @@
   };
 
   // ---------- Fetch de datos ----------
-  async function loadOverview(preset, opt = {}) {
+  function overviewParams(preset, opt = {}) {
     const params = new URLSearchParams();
     if (preset) params.set("date_preset", preset);
     if (preset === "rango") {
@@ -52,13 +52,65 @@
         params.set("date_preset", "hoy");
       }
     }
-    const url = `/api/overview?${params.toString()}`;
-    const res = await fetch(url);
-    if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const json = await res.json();
+    return params;
+  }
+
+  // Caché cliente (DataLayer) por URL de /api/overview: "hoy" dura poco
+  const overviewUrl = (preset, opt) => `/api/overview?${overviewParams(preset, opt).toString()}`;
+  const ttlFor = (preset) => (preset === "hoy" || preset === "today" ? 2 * 60 * 1000 : 10 * 60 * 1000);
+
+  async function loadOverview(preset, opt = {}) {
+    const json = await DataLayer.getJSON(overviewUrl(preset, opt), { ttl: ttlFor(preset), channel: "overview" });
     return json?.data || [];
   }
 
+  // Streaming (SSE): llama onItem por cada clienta apenas llega y
+  // resuelve con el evento "summary". Un nuevo stream cierra el anterior.
+  let currentStream = null;
+
+  function streamOverview(preset, opt = {}, onItem) {
+    if (currentStream) currentStream.close();
+    const url = `/api/overview/stream?${overviewParams(preset, opt).toString()}`;
+    const es = new EventSource(url);
+
+    return new Promise((resolve, reject) => {
+      let received = 0;
+      const stream = {
+        // Reemplazado por otro filtro: cerramos sin pintar nada más
+        close() {
+          es.close();
+          resolve({ received, summary: null, stale: true });
+        },
+      };
+      currentStream = stream;
+
+      es.addEventListener("client", (ev) => {
+        if (currentStream !== stream) return;
+        try {
+          onItem(JSON.parse(ev.data));
+          received += 1;
+        } catch (e) {
+          // evento corrupto: lo ignoramos
+        }
+      });
+      es.addEventListener("summary", (ev) => {
+        es.close();
+        let summary = null;
+        try {
+          summary = JSON.parse(ev.data);
+        } catch (e) {
+          summary = null;
+        }
+        resolve({ received, summary, stale: currentStream !== stream });
+      });
+      es.onerror = () => {
+        // Sin summary => el stream se cortó; no dejamos que EventSource reintente
+        es.close();
+        reject(new Error("stream interrumpido"));
+      };
+    });
+  }
+
   // ---------- Render ----------
   function ensureContainer() {
     // Intenta usar un contenedor existente; si no, crea uno
@@ -97,67 +149,139 @@
     container.appendChild(card);
   }
 
+  function buildCard(it) {
+    const { client_id, client_name, spend, results, cpr } = it || {};
+    const card = document.createElement("div");
+    card.className = "card";
+    card.style.padding = "16px";
+    card.style.borderRadius = "14px";
+    card.style.background = "rgba(255,255,255,0.03)";
+    card.style.border = "1px solid rgba(255,255,255,0.08)";
+
+    const title = document.createElement("div");
+    title.style.fontWeight = "600";
+    title.style.marginBottom = "8px";
+    title.textContent = client_name || client_id || "Cliente";
+
+    const row = (label, value) => {
+      const r = document.createElement("div");
+      r.style.display = "flex";
+      r.style.justifyContent = "space-between";
+      r.style.margin = "4px 0";
+      const l = document.createElement("span");
+      l.style.opacity = "0.8";
+      l.textContent = label;
+      const v = document.createElement("strong");
+      v.textContent = value;
+      r.appendChild(l);
+      r.appendChild(v);
+      return r;
+    };
+
+    const link = document.createElement("a");
+    link.href = `/dashboard/${encodeURIComponent(client_id)}`;
+    link.textContent = "Abrir dashboard";
+    link.style.display = "inline-block";
+    link.style.marginTop = "10px";
+    link.style.fontWeight = "600";
+    link.style.textDecoration = "none";
+    link.style.padding = "8px 10px";
+    link.style.borderRadius = "10px";
+    link.style.background = "rgba(59,130,246,0.15)";
+
+    card.appendChild(title);
+    card.appendChild(row("Gasto (Spend)", money(spend)));
+    card.appendChild(row("Resultados", fmt(results)));
+    card.appendChild(row("CPR", money(cpr)));
+    card.appendChild(link);
+    return card;
+  }
+
+  function createGrid(container) {
+    container.innerHTML = "";
+    const grid = document.createElement("div");
+    grid.style.display = "grid";
+    grid.style.gridTemplateColumns = "repeat(auto-fit, minmax(260px, 1fr))";
+    grid.style.gap = "12px";
+    container.appendChild(grid);
+    return grid;
+  }
+
+  // Inserta el card respetando el orden de clients.json (campo "index" del stream)
+  function insertCard(grid, it) {
+    const card = buildCard(it);
+    const idx = Number(it?.index);
+    if (!isFinite(idx)) {
+      grid.appendChild(card);
+      return;
+    }
+    card.dataset.index = String(idx);
+    const next = Array.from(grid.children).find((c) => Number(c.dataset.index) > idx);
+    grid.insertBefore(card, next || null);
+  }
+
   function renderList(container, items) {
     container.innerHTML = "";
     if (!items || !items.length) {
       renderEmpty(container);
       return;
     }
+    const grid = createGrid(container);
+    items.forEach((it) => grid.appendChild(buildCard(it)));
+  }
 
-    const grid = document.createElement("div");
-    grid.style.display = "grid";
-    grid.style.gridTemplateColumns = "repeat(auto-fit, minmax(260px, 1fr))";
-    grid.style.gap = "12px";
+  // Pinta los cards a medida que llegan por SSE
+  // Al terminar, guarda la lista en DataLayer: volver a este filtro no re-consulta.
+  // Si el stream se corta, completa con /api/overview sin borrar lo ya pintado.
+  async function renderStream(container, preset, opt, isCurrent) {
+    let grid = null;
+    const items = [];
+    const seen = new Set();
+    const add = (it) => {
+      if (!grid) grid = createGrid(container); // el primer card reemplaza "Cargando…"
+      insertCard(grid, it);
+      items.push(it);
+      seen.add(it.client_id);
+    };
 
-    items.forEach((it) => {
-      const { client_id, client_name, spend, results, cpr } = it || {};
-      const card = document.createElement("div");
-      card.className = "card";
-      card.style.padding = "16px";
-      card.style.borderRadius = "14px";
-      card.style.background = "rgba(255,255,255,0.03)";
-      card.style.border = "1px solid rgba(255,255,255,0.08)";
-
-      const title = document.createElement("div");
-      title.style.fontWeight = "600";
-      title.style.marginBottom = "8px";
-      title.textContent = client_name || client_id || "Cliente";
-
-      const row = (label, value) => {
-        const r = document.createElement("div");
-        r.style.display = "flex";
-        r.style.justifyContent = "space-between";
-        r.style.margin = "4px 0";
-        const l = document.createElement("span");
-        l.style.opacity = "0.8";
-        l.textContent = label;
-        const v = document.createElement("strong");
-        v.textContent = value;
-        r.appendChild(l);
-        r.appendChild(v);
-        return r;
-      };
+    let result;
+    try {
+      result = await streamOverview(preset, opt, add);
+    } catch (e) {
+      let data;
+      try {
+        data = await loadOverview(preset, opt);
+      } catch (err) {
+        if (DataLayer.isAbort(err) || !items.length) throw err;
+        // Nos quedamos con lo que alcanzó a llegar y avisamos
+        if (isCurrent()) grid.appendChild(buildNotice("Algunas clientas no se pudieron cargar."));
+        return;
+      }
+      if (!isCurrent()) return;
+      // Mismo orden que el stream: la posición en la lista es el "index"
+      data.forEach((it, i) => {
+        if (!seen.has(it.client_id)) add({ ...it, index: i });
+      });
+      if (!items.length) renderEmpty(container);
+      return;
+    }
 
-      const link = document.createElement("a");
-      link.href = `/dashboard/${encodeURIComponent(client_id)}`;
-      link.textContent = "Abrir dashboard";
-      link.style.display = "inline-block";
-      link.style.marginTop = "10px";
-      link.style.fontWeight = "600";
-      link.style.textDecoration = "none";
-      link.style.padding = "8px 10px";
-      link.style.borderRadius = "10px";
-      link.style.background = "rgba(59,130,246,0.15)";
-
-      card.appendChild(title);
-      card.appendChild(row("Gasto (Spend)", money(spend)));
-      card.appendChild(row("Resultados", fmt(results)));
-      card.appendChild(row("CPR", money(cpr)));
-      card.appendChild(link);
-      grid.appendChild(card);
-    });
+    const { received, summary, stale } = result;
+    if (stale) return;
+    if (summary) {
+      items.sort((a, b) => Number(a.index) - Number(b.index));
+      DataLayer.put(overviewUrl(preset, opt), { data: items }, ttlFor(preset));
+    }
+    if (!received) renderEmpty(container);
+  }
 
-    container.appendChild(grid);
+  function buildNotice(text) {
+    const note = document.createElement("div");
+    note.className = "card empty";
+    note.style.padding = "16px";
+    note.style.opacity = "0.8";
+    note.textContent = text;
+    return note;
   }
 
   // ---------- Binding de botones ----------
@@ -183,22 +307,34 @@
     return buttons;
   }
 
+  let clickSeq = 0;
+
   async function handleClick(btn) {
     const preset = btn.getAttribute("data-preset") || mapPreset(btn.textContent || "");
+    const seq = ++clickSeq;
     setActive(btn);
     const container = ensureContainer();
     renderEmpty(container, "Cargando…");
 
+    const opt = preset === "rango" ? readDateInputs() : {};
     try {
-      let data;
-      if (preset === "rango") {
-        const { since, until } = readDateInputs();
-        data = await loadOverview("rango", { since, until });
+      // Filtro ya visto hace poco: pintamos del caché sin tocar el servidor
+      const hit = await DataLayer.cached(overviewUrl(preset, opt));
+      if (seq !== clickSeq) return; // hubo otro click mientras leíamos el caché
+      if (hit) {
+        if (currentStream) currentStream.close();
+        DataLayer.cancel("overview");
+        renderList(container, hit.data || []);
+        return;
+      }
+      if (window.EventSource) {
+        await renderStream(container, preset, opt, () => seq === clickSeq);
       } else {
-        data = await loadOverview(preset);
+        const data = await loadOverview(preset, opt);
+        if (seq === clickSeq) renderList(container, data);
       }
-      renderList(container, data);
     } catch (e) {
+      if (DataLayer.isAbort(e) || seq !== clickSeq) return; // reemplazado por otro filtro
       renderEmpty(container, "No se pudo cargar. Intenta nuevamente.");
       // console.error(e);
     }
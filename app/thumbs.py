@@ -0,0 +1,277 @@
+# app/thumbs.py
+"""
+Caché de miniaturas de anuncios para /thumb/<ad_id>.
+
+Las thumbnail_url de Meta vienen firmadas, caducan y traen tamaños variables.
+Aquí las descargamos UNA vez, las reducimos (WebP, o JPEG si no hay WebP) y
+las guardamos por contenido (sha256) en CACHE_DIR/thumbs. El índice
+ad_id -> archivo vive en el caché JSON de utils y recuerda el creative_id:
+si el anuncio cambia de creativo, la miniatura se vuelve a descargar.
+version() da el hash para versionar la URL pública (/thumb/<ad_id>?v=...).
+
+- Descargas concurrentes (pool propio) y deduplicadas: dos pedidos del mismo
+  ad_id esperan la misma descarga.
+- warm() descarga en segundo plano, con hilos que siguen después de responder.
+  En Vercel la función se congela al responder, así que ahí viene apagado
+  (THUMB_WARM) y cada miniatura se baja en su propio /thumb/<ad_id>.
+- set_fetcher() permite reemplazar la descarga para tests sin red.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import requests
+
+from app.utils import CACHE_DIR, IS_VERCEL, read_cache, write_cache
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional: sin él guardamos la imagen tal cual
+    Image = None
+
+THUMB_DIR = os.path.join(CACHE_DIR, "thumbs")
+os.makedirs(THUMB_DIR, exist_ok=True)
+
+THUMB_MAX_SIDE = int(os.getenv("THUMB_MAX_SIDE", "320") or 320)
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "80") or 80)
+THUMB_WORKERS = max(1, int(os.getenv("THUMB_WORKERS", "6") or 6))
+THUMB_TIMEOUT = 20
+THUMB_WARM = (os.getenv("THUMB_WARM") or ("0" if IS_VERCEL else "1")) == "1"
+# Vida del índice ad_id -> archivo cuando no sabemos el creative_id
+THUMB_INDEX_TTL = int(os.getenv("THUMB_INDEX_TTL", str(24 * 3600)) or 24 * 3600)
+
+Fetcher = Callable[[str], bytes]
+Resolver = Callable[[str], Optional[str]]
+
+
+def _http_fetch(url: str) -> bytes:
+    r = requests.get(url, timeout=THUMB_TIMEOUT)
+    r.raise_for_status()
+    return r.content
+
+
+_fetcher: Fetcher = _http_fetch
+
+
+def set_fetcher(fn: Optional[Fetcher]) -> None:
+    """Reemplaza la descarga de imágenes (p. ej. stub offline). None restaura HTTP."""
+    global _fetcher
+    _fetcher = fn or _http_fetch
+
+
+# -----------------------------------------------------------------------------
+# URL de origen por anuncio
+# -----------------------------------------------------------------------------
+_sources: Dict[str, Dict[str, str]] = {}
+
+
+def remember_source(ad_id: str, url: Optional[str], creative_id: Optional[str] = None) -> None:
+    """Guarda la thumbnail_url (y el creative_id) que vimos en Graph."""
+    if not ad_id or not url:
+        return
+    prev = _source(ad_id)
+    src = {"url": url, "creative": str(creative_id or prev.get("creative") or "")}
+    if prev == src:
+        return
+    _sources[ad_id] = src
+    write_cache(f"thumbsrc_{ad_id}", src)
+
+
+def _source(ad_id: str) -> Dict[str, str]:
+    src = _sources.get(ad_id)
+    if src:
+        return src
+    cached = read_cache(f"thumbsrc_{ad_id}", ttl_seconds=0) or {}
+    return {"url": cached.get("url") or "", "creative": cached.get("creative") or ""}
+
+
+def source_for(ad_id: str) -> Optional[str]:
+    return _source(ad_id).get("url") or None
+
+
+# -----------------------------------------------------------------------------
+# Procesado y almacenamiento por contenido
+# -----------------------------------------------------------------------------
+_EXT = {"image/webp": "webp", "image/jpeg": "jpg", "image/png": "png", "image/gif": "gif"}
+
+
+def _sniff_mime(data: bytes) -> str:
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def downscale(data: bytes) -> Optional[Tuple[bytes, str]]:
+    """
+    Reduce la imagen a THUMB_MAX_SIDE px de lado. Devuelve (bytes, mime),
+    o None si los bytes no son una imagen (p. ej. una página de error).
+    """
+    mime = _sniff_mime(data)
+    if Image is None:
+        return (data, mime) if mime in _EXT else None
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.thumbnail((THUMB_MAX_SIDE, THUMB_MAX_SIDE))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        out = io.BytesIO()
+        try:
+            img.save(out, format="WEBP", quality=THUMB_QUALITY, method=4)
+            return out.getvalue(), "image/webp"
+        except (KeyError, OSError):
+            # Pillow compilado sin WebP
+            out = io.BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=THUMB_QUALITY, optimize=True)
+            return out.getvalue(), "image/jpeg"
+    except Exception:
+        if mime not in _EXT:
+            return None
+        logging.exception("[thumbs] No se pudo reducir la imagen; se guarda original")
+        return data, mime
+
+
+def _store(data: bytes, mime: str) -> Dict[str, str]:
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{digest}.{_EXT[mime]}"
+    path = os.path.join(THUMB_DIR, name)
+    if not os.path.exists(path):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return {"hash": digest, "mime": mime, "file": name}
+
+
+def lookup(ad_id: str) -> Optional[Dict[str, str]]:
+    """
+    Entrada ya cacheada ({hash, mime, path}) o None. Si el anuncio cambió de
+    creativo (o, sin creative_id, pasó THUMB_INDEX_TTL) hay que volver a bajarla.
+    """
+    creative = _source(ad_id).get("creative")
+    entry = read_cache(f"thumb_{ad_id}", ttl_seconds=0 if creative else THUMB_INDEX_TTL)
+    if not entry or not entry.get("file"):
+        return None
+    if creative and entry.get("creative") != creative:
+        return None
+    path = os.path.join(THUMB_DIR, entry["file"])
+    if not os.path.exists(path):
+        return None
+    return {**entry, "path": path}
+
+
+def version(ad_id: str) -> Optional[str]:
+    """Hash corto del contenido actual (para ?v=), o None si aún no se descargó."""
+    hit = lookup(ad_id)
+    return hit["hash"][:16] if hit else None
+
+
+def _build(ad_id: str, resolve: Optional[Resolver]) -> Optional[Dict[str, str]]:
+    url = source_for(ad_id)
+    raw: Optional[bytes] = None
+    if url:
+        try:
+            raw = _fetcher(url)
+        except Exception:
+            # URL firmada vencida: pedimos una nueva a Graph (abajo)
+            logging.info("[thumbs] Falló descarga de %s; se reintenta con URL fresca", ad_id)
+    if raw is None and resolve:
+        fresh = resolve(ad_id)
+        if fresh and fresh != url:
+            remember_source(ad_id, fresh)
+            raw = _fetcher(fresh)
+    if raw is None:
+        return None
+
+    image = downscale(raw)
+    if image is None:
+        logging.warning("[thumbs] La descarga de %s no es una imagen; no se cachea", ad_id)
+        return None
+    entry = {**_store(*image), "creative": _source(ad_id).get("creative") or ""}
+    write_cache(f"thumb_{ad_id}", entry)
+    return {**entry, "path": os.path.join(THUMB_DIR, entry["file"])}
+
+
+# -----------------------------------------------------------------------------
+# Descargas concurrentes y deduplicadas
+# -----------------------------------------------------------------------------
+_pool = ThreadPoolExecutor(max_workers=THUMB_WORKERS, thread_name_prefix="thumbs")
+# Descargas en curso por ad_id, sean de warm() o de un request
+_inflight: Dict[str, Future] = {}
+_lock = threading.RLock()
+
+
+def _forget(ad_id: str, fut: Future) -> None:
+    with _lock:
+        if _inflight.get(ad_id) is fut:
+            del _inflight[ad_id]
+
+
+def _submit(ad_id: str, resolve: Optional[Resolver]) -> Future:
+    with _lock:
+        fut = _inflight.get(ad_id)
+        if fut is None:
+            fut = _pool.submit(_build, ad_id, resolve)
+            _inflight[ad_id] = fut
+    fut.add_done_callback(lambda f: _forget(ad_id, f))
+    return fut
+
+
+def get(ad_id: str, resolve: Optional[Resolver] = None) -> Optional[Dict[str, str]]:
+    """
+    Miniatura del anuncio (descargándola si hace falta) o None si no hay.
+    Descarga en el hilo que llama: si hay una descarga de warm() corriendo
+    se espera esa; si todavía está en cola se cancela y se hace aquí mismo.
+    """
+    hit = lookup(ad_id)
+    if hit:
+        return hit
+    with _lock:
+        fut = _inflight.get(ad_id)
+        if fut is not None and fut.cancel():
+            fut = None  # warm() sin empezar: no esperamos la cola
+        owner = fut is None
+        if owner:
+            fut = Future()
+            fut.set_running_or_notify_cancel()  # ya corriendo: nadie más la cancela
+            _inflight[ad_id] = fut
+
+    try:
+        if not owner:
+            entry = fut.result(timeout=THUMB_TIMEOUT * 2)
+            if entry is None and resolve:
+                # Nos colgamos de un warm() sin resolver y su URL ya no servía
+                entry = _build(ad_id, resolve)
+            return entry
+        try:
+            entry = _build(ad_id, resolve)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        fut.set_result(entry)
+        return entry
+    except Exception:
+        logging.exception("[thumbs] No se pudo obtener miniatura de %s", ad_id)
+        return None
+    finally:
+        if owner:
+            _forget(ad_id, fut)
+
+
+def warm(items: Iterable[Tuple[str, Optional[str]]]) -> None:
+    """Registra URLs de origen y descarga en segundo plano las que falten."""
+    for ad_id, url in items:
+        remember_source(ad_id, url)
+        if THUMB_WARM and url and not lookup(ad_id):
+            _submit(ad_id, None)
@@ -0,0 +1,10 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Caché en un directorio temporal: app.utils lo fija al importarse
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="dash-tests-")
+os.environ.setdefault("ACCESS_TOKEN", "test-token")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
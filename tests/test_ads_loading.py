@@ -0,0 +1,110 @@
+# tests/test_ads_loading.py
+import itertools
+import threading
+import time
+
+import pytest
+
+from app import create_app, routes
+
+_ids = itertools.count(8_100_001)
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    """build_ads_payload falso: las campañas en 'slow' esperan a 'gate'."""
+    state = {"slow": set(), "gate": threading.Event(), "started": threading.Event(), "calls": []}
+
+    def build(campaign_id, date_params, force_async=False):
+        state["calls"].append(campaign_id)
+        if campaign_id in state["slow"]:
+            state["started"].set()
+            state["gate"].wait(5)
+        return [{"id": f"ad-{campaign_id}", "spend": 1.0}], None
+
+    monkeypatch.setattr(routes, "build_ads_payload", build)
+    yield state
+    state["gate"].set()
+
+
+def _date_params(app):
+    with app.test_request_context("/"):
+        return routes.build_date_params()
+
+
+def _ids_n(n):
+    return [str(next(_ids)) for _ in range(n)]
+
+
+def test_click_does_not_wait_behind_prefetch(app, graph):
+    prefetched = _ids_n(routes.PREFETCH_WORKERS + 1)
+    graph["slow"].update(prefetched)
+    routes.prefetch_ads(prefetched, _date_params(app))
+    assert graph["started"].wait(2)
+
+    clicked = str(next(_ids))
+    t0 = time.monotonic()
+    res = app.test_client().get(f"/get_ads_by_campaign/{clicked}")
+    assert res.status_code == 200
+    assert res.get_json()["data"][0]["id"] == f"ad-{clicked}"
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_click_shares_running_prefetch(app, graph):
+    cid = str(next(_ids))
+    graph["slow"].add(cid)
+    routes.prefetch_ads([cid], _date_params(app))
+    assert graph["started"].wait(2)
+
+    out = {}
+    t = threading.Thread(target=lambda: out.update(res=app.test_client().get(f"/get_ads_by_campaign/{cid}")))
+    t.start()
+    time.sleep(0.1)
+    graph["gate"].set()
+    t.join(5)
+
+    assert out["res"].get_json()["data"][0]["id"] == f"ad-{cid}"
+    assert graph["calls"].count(cid) == 1
+
+
+def test_click_takes_over_queued_prefetch(app, graph):
+    busy = _ids_n(routes.PREFETCH_WORKERS)
+    queued = str(next(_ids))
+    graph["slow"].update(busy)
+    routes.prefetch_ads(busy + [queued], _date_params(app))
+    assert graph["started"].wait(2)
+
+    res = app.test_client().get(f"/get_ads_by_campaign/{queued}")
+    assert res.get_json()["data"][0]["id"] == f"ad-{queued}"
+    graph["gate"].set()
+    time.sleep(0.2)
+    assert graph["calls"].count(queued) == 1
+
+
+def test_batch_returns_each_campaign(app, graph):
+    ids = _ids_n(3)
+    res = app.test_client().get(f"/get_ads_by_campaigns?ids={','.join(ids)},abc")
+    body = res.get_json()
+    assert sorted(body["data"]) == sorted(ids)
+    assert body["jobs"] == {}
+
+
+def test_campaigns_prefetch_only_when_requested(app, monkeypatch):
+    rows = [{"campaign_id": "11", "spend": "9.00"}, {"campaign_id": "12", "spend": "3.00"}]
+    monkeypatch.setattr(routes, "fb_paginate_first_level", lambda path, params, limit=500: [])
+    monkeypatch.setattr(routes, "fb_get", lambda path, params: {"data": rows})
+    prefetched = []
+    monkeypatch.setattr(routes, "prefetch_ads", lambda ids, params: prefetched.append(list(ids)))
+    monkeypatch.setattr(routes, "PREFETCH_TOP_N", 5)
+    client = app.test_client()
+
+    assert len(client.get("/get_campaigns_active/123?date_preset=ayer").get_json()["data"]) == 2
+    assert prefetched == []
+
+    client.get("/get_campaigns_active/123?date_preset=hoy&prefetch=1")
+    assert prefetched == [["11", "12"]]
@@ -0,0 +1,38 @@
+# tests/test_insights_agg.py
+import random
+
+from app import insights_agg as agg
+
+MSG = agg.DEFAULT_MESSAGE_ACTION_TYPES[0]
+
+
+def test_group_by_entity_matches_legacy_loop():
+    rnd = random.Random(3)
+    rows = [
+        {
+            "ad_id": str(rnd.randrange(20)),
+            "spend": f"{rnd.uniform(0, 50):.2f}",
+            "actions": [
+                {"action_type": MSG, "value": str(rnd.randrange(5))},
+                {"action_type": "link_click", "value": "9"},
+            ],
+        }
+        for _ in range(500)
+    ]
+    legacy = agg._legacy_group(rows, "ad_id")
+    fast = agg.group_by_entity(agg.parse_rows(rows, id_field="ad_id"))
+    assert fast == legacy
+
+
+def test_rounding_matches_python_round():
+    # np.round daría 495.18; round() de Python da 495.19
+    rows = [{"spend": "495.185", "actions": [{"action_type": MSG, "value": "1"}]}]
+    frame = agg.parse_rows(rows)
+    assert frame.spend.tolist() == [round(495.185, 2)]
+    assert agg.per_row(frame)["cpr"].tolist() == [round(495.185, 2)]
+
+
+def test_date_column_is_lazy():
+    frame = agg.parse_rows([{"date_start": "2025-03-01", "spend": "1"}])
+    assert frame._date is None
+    assert str(frame.date[0]) == "2025-03-01"
@@ -0,0 +1,50 @@
+# tests/test_overview_stream.py
+import json
+
+from app import create_app, routes
+from app.registry import ClientRegistry
+
+
+def _events(body):
+    out = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def test_stream_emits_each_client_with_index_and_summary(tmp_path, monkeypatch):
+    path = tmp_path / "clients.json"
+    path.write_text(
+        json.dumps(
+            {
+                "a": {"client_name": "A", "ad_account_ids": ["act_1", "act_2"]},
+                "vacia": {"client_name": "Sin cuentas", "ad_account_ids": []},
+                "b": {"client_name": "B", "ad_account_ids": ["3"]},
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(routes, "registry", ClientRegistry(str(path), reload_seconds=0))
+    totals = {"act_1": (10.0, 2.0), "act_2": (5.0, 1.0), "act_3": (4.0, 0.0)}
+    monkeypatch.setattr(routes, "fetch_account_totals", lambda acc, params: totals[routes.normalize_account(acc)])
+
+    res = create_app().test_client().get("/api/overview/stream?date_preset=hoy")
+    assert res.mimetype == "text/event-stream"
+    events = _events(res.get_data(as_text=True))
+
+    clients = [data for name, data in events if name == "client"]
+    assert len(clients) == 3
+    # La clienta sin cuentas sale de inmediato, antes de cualquier consulta
+    assert clients[0]["client_id"] == "vacia"
+    assert {c["client_id"]: c["index"] for c in clients} == {"a": 0, "vacia": 1, "b": 2}
+    by_id = {c["client_id"]: c for c in clients}
+    assert by_id["a"]["spend"] == 15.0 and by_id["a"]["results"] == 3.0 and by_id["a"]["cpr"] == 5.0
+    assert by_id["vacia"]["spend"] == 0.0
+
+    name, summary = events[-1]
+    assert name == "summary"
+    assert summary["clients"] == 3
+    assert summary["spend"] == 19.0 and summary["results"] == 3.0
+    assert summary["paging"]["total"] == 3 and summary["paging"]["next_offset"] is None
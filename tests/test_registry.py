@@ -0,0 +1,43 @@
+# tests/test_registry.py
+import json
+import logging
+import os
+
+from app.registry import ClientRegistry
+
+
+def _write(path, data, mtime):
+    path.write_text(data if isinstance(data, str) else json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_reloads_on_change_and_logs_invalid_json_once(tmp_path, caplog):
+    path = tmp_path / "clients.json"
+    _write(path, {"a": {"client_name": "A", "ad_account_ids": ["1"]}}, 1_000)
+    reg = ClientRegistry(str(path), reload_seconds=0)
+    assert reg.for_account("act_1")[0] == "a"
+
+    _write(path, "{ roto", 2_000)
+    with caplog.at_level(logging.ERROR):
+        for _ in range(3):
+            assert "a" in reg  # sigue la versión anterior
+    assert len([r for r in caplog.records if "No se pudo leer" in r.getMessage()]) == 1
+
+    _write(path, {"b": {"client_name": "B", "ad_account_ids": ["act_2"]}}, 3_000)
+    assert "b" in reg and "a" not in reg
+
+
+def test_overview_paging_stops_on_empty_page(monkeypatch):
+    from app import create_app, routes
+    from app.registry import registry
+
+    monkeypatch.setattr(routes, "fetch_account_totals", lambda acc, params: (1.0, 1.0))
+    client = create_app().test_client()
+
+    paging = client.get("/api/overview?limit=0").get_json()["paging"]
+    assert paging["next_offset"] is None
+
+    slug = next(iter(registry.all()))
+    one = client.get(f"/api/overview?client={slug}").get_json()
+    assert [c["client_id"] for c in one["data"]] == [slug]
+    assert client.get("/api/overview?client=nadie").get_json()["data"] == []
@@ -0,0 +1,152 @@
+# tests/test_report_jobs.py
+import itertools
+import json
+import os
+
+import pytest
+
+from app import report_jobs
+from app.utils import CACHE_DIR
+
+_ids = itertools.count(7_000_001)
+
+LONG_RANGE = {
+    "level": "ad",
+    "fields": "ad_id,spend,actions",
+    "time_range": json.dumps({"since": "2025-01-01", "until": "2025-03-31"}),
+}
+
+
+class GraphStub:
+    """Simula POST /insights -> Job Running -> Job Completed -> resultados por cursor."""
+
+    def __init__(self, run_id="555001", pages=None, running_polls=1, accept=True):
+        self.run_id = run_id
+        self.pages = pages or [
+            [{"ad_id": "1", "spend": "10.00"}, {"ad_id": "2", "spend": "5.00"}],
+            [{"ad_id": "3", "spend": "1.50"}],
+        ]
+        self.running_polls = running_polls
+        self.accept = accept
+        self.calls = []
+
+    def post(self, path, params):
+        self.calls.append(("POST", path, dict(params)))
+        return {"report_run_id": self.run_id} if self.accept else {"error": True}
+
+    def get(self, path, params):
+        self.calls.append(("GET", path, dict(params)))
+        if path == self.run_id:
+            if self.running_polls > 0:
+                self.running_polls -= 1
+                return {"async_status": "Job Running", "async_percent_completion": 40}
+            return {"async_status": "Job Completed", "async_percent_completion": 100}
+        if path == f"{self.run_id}/insights":
+            page = int(params.get("after") or 0)
+            out = {"data": self.pages[page]}
+            if page + 1 < len(self.pages):
+                out["paging"] = {"cursors": {"after": str(page + 1)}, "next": "https://graph/next"}
+            return out
+        if path.endswith("/insights"):
+            return {"data": [{"spend": "2.00"}]}  # GET síncrono
+        raise AssertionError(f"llamada inesperada: {path}")
+
+
+@pytest.fixture
+def graph():
+    stub = GraphStub(run_id=str(next(_ids)))
+    report_jobs.configure(get=stub.get, post=stub.post)
+    yield stub
+    from app import routes
+
+    report_jobs.configure(get=routes.fb_get, post=routes.fb_post)
+
+
+def test_job_lifecycle(graph):
+    object_id = str(next(_ids))
+    params = {**LONG_RANGE, "fields": f"ad_id,spend,{object_id}"}
+    assert report_jobs.needs_async(params)
+
+    job = report_jobs.start(object_id, params)
+    assert job["id"] == graph.run_id and job["status"] == report_jobs.STATUS_RUNNING
+    # Mismo reporte en curso: no se lanza otro
+    assert report_jobs.start(object_id, params)["id"] == graph.run_id
+    assert sum(1 for c in graph.calls if c[0] == "POST") == 1
+
+    running = report_jobs.status(graph.run_id)
+    assert running["status"] == report_jobs.STATUS_RUNNING and running["percent"] == 40
+
+    done = report_jobs.status(graph.run_id)
+    assert done["status"] == report_jobs.STATUS_DONE and done["rows"] == 3
+
+    pages = [c[2] for c in graph.calls if c[1] == f"{graph.run_id}/insights"]
+    assert [p.get("after") for p in pages] == [None, "1"]
+    assert [r["ad_id"] for r in report_jobs.cached_rows(job["key"])] == ["1", "2", "3"]
+
+
+def test_start_without_report_run_id_fails(graph):
+    graph.accept = False
+    job = report_jobs.start(str(next(_ids)), LONG_RANGE)
+    assert job["status"] == report_jobs.STATUS_FAILED and job["id"] is None
+
+
+def test_status_ignores_client_supplied_key(graph):
+    client = _client()
+    res = client.get("/api/insights_jobs/999?key=report_deadbeef")
+    assert res.get_json()["status"] == report_jobs.STATUS_UNKNOWN
+    assert not os.path.exists(os.path.join(CACHE_DIR, "report_deadbeef_rows.json"))
+    assert graph.calls == []
+
+
+def _client():
+    from app import create_app
+
+    return create_app().test_client()
+
+
+def _insights_url(campaign_id):
+    return (
+        f"/get_insights/campaign/{campaign_id}"
+        "?date_preset=rango&since=2025-01-01&until=2025-03-31&time_increment=1"
+    )
+
+
+def test_route_202_then_done_then_cached(graph):
+    client = _client()
+    url = _insights_url(next(_ids))
+
+    first = client.get(url)
+    assert first.status_code == 202
+    job = first.get_json()["job"]
+    assert job["id"] == graph.run_id
+
+    assert client.get(f"/api/insights_jobs/{job['id']}").get_json()["status"] == "running"
+    assert client.get(f"/api/insights_jobs/{job['id']}").get_json()["status"] == "done"
+
+    calls = len(graph.calls)
+    again = client.get(url)
+    assert again.status_code == 200
+    assert again.get_json()["summary"]["spend"] == 16.5
+    assert len(graph.calls) == calls  # sale del caché, sin ir a Graph
+
+
+def test_route_falls_back_to_sync_without_report_run_id(graph, monkeypatch):
+    from app import routes
+
+    graph.accept = False
+    monkeypatch.setattr(routes, "fb_get", graph.get)
+    res = _client().get(_insights_url(next(_ids)))
+    assert res.status_code == 200
+    assert res.get_json()["summary"]["spend"] == 2.0
+    assert any(c[0] == "GET" and c[1].endswith("/insights") for c in graph.calls)
+
+
+def test_unknown_job_is_restarted_by_the_original_route(graph):
+    # Otra instancia (sin reportrun_<id>) recibe el polling: 'unknown', y la
+    # ruta original vuelve a lanzar el job en vez de devolver una lista vacía
+    client = _client()
+    assert client.get("/api/insights_jobs/424242").get_json()["status"] == report_jobs.STATUS_UNKNOWN
+
+    res = client.get(_insights_url(next(_ids)))
+    assert res.status_code == 202
+    assert res.get_json()["job"]["id"] == graph.run_id
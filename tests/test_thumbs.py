@@ -0,0 +1,139 @@
+# tests/test_thumbs.py
+import io
+import itertools
+import threading
+import time
+
+import pytest
+
+from app import thumbs
+
+_ids = itertools.count(910_000)
+
+
+def png_bytes() -> bytes:
+    if thumbs.Image is None:
+        return b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+    out = io.BytesIO()
+    thumbs.Image.new("RGB", (640, 480), (200, 40, 40)).save(out, format="PNG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def ad_id():
+    return str(next(_ids))
+
+
+@pytest.fixture(autouse=True)
+def restore_fetcher():
+    yield
+    thumbs.set_fetcher(None)
+
+
+def test_concurrent_gets_share_one_download(ad_id):
+    calls = []
+    gate = threading.Event()
+
+    def fetch(url):
+        calls.append(url)
+        gate.wait(2)
+        return png_bytes()
+
+    thumbs.set_fetcher(fetch)
+    thumbs.remember_source(ad_id, "https://cdn.example/a.jpg", "c1")
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(thumbs.get(ad_id))) for _ in range(2)]
+    for w in workers:
+        w.start()
+    time.sleep(0.1)
+    gate.set()
+    for w in workers:
+        w.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 2 and all(results)
+    assert results[0]["hash"] == results[1]["hash"]
+
+
+def test_expired_url_is_resolved_again(ad_id):
+    def fetch(url):
+        if "expired" in url:
+            raise RuntimeError("403 URL signature expired")
+        return png_bytes()
+
+    resolved = []
+
+    def resolve(aid):
+        resolved.append(aid)
+        return "https://cdn.example/fresh.jpg"
+
+    thumbs.set_fetcher(fetch)
+    thumbs.remember_source(ad_id, "https://cdn.example/expired.jpg", "c1")
+
+    entry = thumbs.get(ad_id, resolve=resolve)
+
+    assert resolved == [ad_id]
+    assert entry and entry["mime"].startswith("image/")
+    assert thumbs.source_for(ad_id) == "https://cdn.example/fresh.jpg"
+
+
+def test_non_image_bytes_are_not_cached(ad_id):
+    thumbs.set_fetcher(lambda url: b"<html>error</html>")
+    thumbs.remember_source(ad_id, "https://cdn.example/a.jpg", "c1")
+
+    assert thumbs.get(ad_id) is None
+    assert thumbs.lookup(ad_id) is None
+
+
+def test_new_creative_invalidates_cached_thumb(ad_id):
+    thumbs.set_fetcher(lambda url: png_bytes())
+    thumbs.remember_source(ad_id, "https://cdn.example/a.jpg", "c1")
+    assert thumbs.get(ad_id)
+    assert thumbs.version(ad_id)
+
+    thumbs.remember_source(ad_id, "https://cdn.example/b.jpg", "c2")
+    assert thumbs.lookup(ad_id) is None
+
+
+def test_thumb_route_is_immutable_only_when_versioned(ad_id):
+    from app import create_app
+    from app.routes import thumb_proxy_url
+
+    thumbs.set_fetcher(lambda url: png_bytes())
+    client = create_app().test_client()
+    assert thumb_proxy_url(ad_id, "https://cdn.example/a.jpg", "c1") == f"/thumb/{ad_id}"
+
+    plain = client.get(f"/thumb/{ad_id}")
+    assert plain.status_code == 200
+    assert "immutable" not in plain.headers["Cache-Control"]
+    assert plain.headers["ETag"]
+
+    url = thumb_proxy_url(ad_id, "https://cdn.example/a.jpg", "c1")
+    assert url.startswith(f"/thumb/{ad_id}?v=")
+    versioned = client.get(url)
+    assert "immutable" in versioned.headers["Cache-Control"]
+
+
+def test_get_takes_over_queued_warm_download():
+    gate = threading.Event()
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        if "slow" in url:
+            gate.wait(5)
+        return png_bytes()
+
+    thumbs.set_fetcher(fetch)
+    busy = [(str(next(_ids)), f"https://cdn.example/slow-{i}.jpg") for i in range(thumbs.THUMB_WORKERS)]
+    target = str(next(_ids))
+    try:
+        thumbs.warm(busy + [(target, "https://cdn.example/target.jpg")])
+        t0 = time.monotonic()
+        entry = thumbs.get(target)
+        assert entry and time.monotonic() - t0 < 1.0
+    finally:
+        gate.set()
+    time.sleep(0.2)
+    assert calls.count("https://cdn.example/target.jpg") == 1